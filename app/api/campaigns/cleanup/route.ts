@@ -76,12 +76,14 @@ export async function POST(request: NextRequest) {
         );
 
         if (hasExpiredError || hasInvalidError) {
-          // Mark as invalid
+          // Mark as invalid, and cache it so send-coffee rejects the campaign without a probe
           await supabase
             .from('campaigns')
             .update({
               is_valid: false,
-              is_expired: hasExpiredError
+              is_expired: hasExpiredError,
+              validation_result: hasExpiredError ? 'expired' : 'invalid',
+              last_validated_at: new Date().toISOString(),
             })
             .eq('campaign_id', campaign.campaign_id);
 
@@ -7,6 +7,51 @@ export const runtime = 'edge';
 const supabaseUrl = process.env.NEXT_PUBLIC_SUPABASE_URL!;
 const supabaseKey = process.env.NEXT_PUBLIC_SUPABASE_ANON_KEY!
 
+// Maximum number of campaigns accepted in one batch POST
+const MAX_BATCH_SIZE = 500;
+
+// Capital One validations run at most this many at a time per batch
+const VALIDATION_CONCURRENCY = parseInt(process.env.CAMPAIGN_VALIDATION_CONCURRENCY || '8');
+
+type BatchResult = {
+  full_link: string;
+  campaign_id: string | null;
+  created: boolean;
+  existing: boolean;
+  campaign?: any;
+  error?: string;
+  type?: string;
+};
+
+// Result type for a failed validation. Only Capital One's invalid campaign (107) and
+// expired (108) answers are definitive; anything else (network errors, throttling)
+// is reported as 'error' so callers retry instead of remembering the campaign as bad.
+function validationFailureType(validation: { error?: string; expired?: boolean }): string {
+  if (validation.expired) return 'expired';
+  if (validation.error === 'Invalid Campaign Id') return 'invalid';
+  return 'error';
+}
+
+// Run `fn` over `items` with at most `limit` calls in flight; results keep the input order
+async function mapWithConcurrency<T, R>(
+  items: T[],
+  limit: number,
+  fn: (item: T, index: number) => Promise<R>
+): Promise<R[]> {
+  const results: R[] = new Array(items.length);
+  let next = 0;
+
+  const worker = async () => {
+    while (next < items.length) {
+      const index = next++;
+      results[index] = await fn(items[index], index);
+    }
+  };
+
+  await Promise.all(Array.from({ length: Math.min(limit, items.length) }, worker));
+  return results;
+}
+
 // GET - Fetch campaigns
 export async function GET(request: NextRequest) {
   try {
@@ -92,10 +137,165 @@ export async function GET(request: NextRequest) {
   }
 }
 
-// POST - Add a new campaign
+// Record many campaigns at once: one lookup for existing campaigns, bounded
+// parallel validation of the new ones, and a single upsert for everything that passed
+async function recordCampaignBatch(items: any[]) {
+  if (items.length === 0) {
+    return NextResponse.json({ error: 'No campaigns provided' }, { status: 400 });
+  }
+
+  if (items.length > MAX_BATCH_SIZE) {
+    return NextResponse.json({
+      error: `Too many campaigns in one request (max ${MAX_BATCH_SIZE})`
+    }, { status: 400 });
+  }
+
+  const results: BatchResult[] = items.map((item) => {
+    const full_link = item?.full_link;
+    const source = item?.source;
+
+    if (!full_link || !source) {
+      return { full_link, campaign_id: null, created: false, existing: false, error: 'full_link and source are required' };
+    }
+
+    if (!['auto', 'manual'].includes(source)) {
+      return { full_link, campaign_id: null, created: false, existing: false, error: 'Source must be either "auto" or "manual"' };
+    }
+
+    const { campaignId } = parseCoffreeLink(cleanCoffreeUrl(full_link));
+    return { full_link, campaign_id: campaignId || null, created: false, existing: false };
+  });
+
+  const supabase = createClient(supabaseUrl, supabaseKey);
+
+  const campaignIds = [...new Set(results.filter(r => !r.error && r.campaign_id).map(r => r.campaign_id as string))];
+
+  const { data: existingRows, error: existingError } = campaignIds.length > 0
+    ? await supabase.from('campaigns').select('*').in('campaign_id', campaignIds)
+    : { data: [], error: null };
+
+  if (existingError) {
+    console.error('Error fetching existing campaigns:', existingError);
+    return NextResponse.json({
+      error: 'Failed to look up campaigns',
+      details: existingError.message
+    }, { status: 500 });
+  }
+
+  const existingById = new Map((existingRows || []).map(row => [row.campaign_id, row]));
+
+  // Collect the first occurrence of every campaign that isn't stored yet
+  const pending = new Map<string, { item: any; cleanedLink: string; marketingChannel: string }>();
+
+  items.forEach((item, i) => {
+    const result = results[i];
+    if (result.error) return;
+
+    const cleanedLink = cleanCoffreeUrl(item.full_link);
+    const { campaignId, marketingChannel } = parseCoffreeLink(cleanedLink);
+
+    if (!campaignId || !marketingChannel) {
+      result.error = 'Invalid coffree link - could not extract campaign ID or marketing channel';
+      return;
+    }
+
+    const existing = existingById.get(campaignId);
+    if (existing) {
+      result.existing = true;
+      result.campaign = existing;
+      return;
+    }
+
+    if (!pending.has(campaignId)) {
+      pending.set(campaignId, { item, cleanedLink, marketingChannel });
+    }
+  });
+
+  // Validate the new campaigns with Capital One before inserting, a bounded number at a time
+  const validations = new Map<string, { valid: boolean; error?: string; expired?: boolean }>();
+  const validatedAt = new Date().toISOString();
+  await mapWithConcurrency([...pending.entries()], VALIDATION_CONCURRENCY, async ([campaignId, { marketingChannel }]) => {
+    validations.set(campaignId, await validateCampaign(campaignId, marketingChannel));
+  });
+
+  const rows = [...pending.entries()]
+    .filter(([campaignId]) => validations.get(campaignId)?.valid)
+    .map(([campaignId, { item, cleanedLink, marketingChannel }]) => ({
+      campaign_id: campaignId,
+      marketing_channel: marketingChannel,
+      full_link: cleanedLink,
+      source: item.source,
+      reddit_post_url: item.reddit_post_url ?? null,
+      reddit_subreddit: item.reddit_subreddit ?? null,
+      notes: item.notes ?? null,
+      is_valid: true,
+      is_expired: false,
+      // Seeds the validation cache so /api/send-coffee skips its probe
+      validation_result: 'valid',
+      last_validated_at: validatedAt,
+    }));
+
+  // Single upsert; rows inserted concurrently by someone else are ignored and reported as existing
+  const { data: insertedRows, error: insertError } = rows.length > 0
+    ? await supabase
+        .from('campaigns')
+        .upsert(rows, { onConflict: 'campaign_id', ignoreDuplicates: true })
+        .select()
+    : { data: [], error: null };
+
+  if (insertError) {
+    console.error('Error inserting campaigns:', insertError);
+    return NextResponse.json({
+      error: 'Failed to add campaigns',
+      details: insertError.message
+    }, { status: 500 });
+  }
+
+  const insertedById = new Map((insertedRows || []).map(row => [row.campaign_id, row]));
+  const createdIds = new Set<string>();
+
+  results.forEach((result) => {
+    if (result.error || result.existing || !result.campaign_id) return;
+
+    const validation = validations.get(result.campaign_id);
+    if (validation && !validation.valid) {
+      result.error = `Campaign validation failed: ${validation.error}`;
+      result.type = validationFailureType(validation);
+      return;
+    }
+
+    const inserted = insertedById.get(result.campaign_id);
+    if (inserted && !createdIds.has(result.campaign_id)) {
+      // Only the first occurrence of a campaign in the batch counts as created
+      createdIds.add(result.campaign_id);
+      result.created = true;
+      result.campaign = inserted;
+    } else {
+      result.existing = true;
+      result.campaign = inserted;
+    }
+  });
+
+  return NextResponse.json({
+    success: true,
+    results,
+    summary: {
+      created: results.filter(r => r.created).length,
+      existing: results.filter(r => r.existing).length,
+      failed: results.filter(r => r.error).length,
+    }
+  });
+}
+
+// POST - Add a new campaign, or a batch of campaigns when the body is an array
 export async function POST(request: NextRequest) {
   try {
     const body = await request.json();
+
+    if (Array.isArray(body) || Array.isArray(body?.campaigns)) {
+      return await recordCampaignBatch(Array.isArray(body) ? body : body.campaigns);
+    }
+
     const {
       full_link,
       source,
@@ -149,7 +349,7 @@ export async function POST(request: NextRequest) {
     if (!validation.valid) {
       return NextResponse.json({
         error: `Campaign validation failed: ${validation.error}`,
-        type: validation.expired ? 'expired' : 'invalid'
+        type: validationFailureType(validation)
       }, { status: 400 });
     }
 
@@ -166,6 +366,8 @@ export async function POST(request: NextRequest) {
         notes,
         is_valid: true,
         is_expired: false,
+        validation_result: 'valid',
+        last_validated_at: new Date().toISOString(),
       })
       .select()
       .single();
@@ -214,6 +416,11 @@ export async function PATCH(request: NextRequest) {
     if (is_valid !== undefined) updates.is_valid = is_valid;
     if (is_expired !== undefined) updates.is_expired = is_expired;
     if (notes !== undefined) updates.notes = notes;
+    // A manual status change invalidates the cached validation result
+    if (is_valid !== undefined || is_expired !== undefined) {
+      updates.validation_result = null;
+      updates.last_validated_at = null;
+    }
 
     if (Object.keys(updates).length === 0) {
       return NextResponse.json({
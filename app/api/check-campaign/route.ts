@@ -15,24 +15,21 @@ export async function GET(request: NextRequest) {
       return NextResponse.json({ error: 'Campaign ID is required' }, { status: 400 });
     }
 
+    // Same rule as the bulk lookup: submitted means sent to every subscriber
     const supabase = createClient(supabaseUrl, supabaseKey);
-    const { data: logs, error } = await supabase
-      .from('message_logs')
-      .select('created_at')
-      .eq('campaign_id', campaignId)
-      .limit(1);
+    const { data, error } = await supabase.rpc('submitted_campaign_ids', { cids: [campaignId] });
 
     if (error) {
       console.error('Error checking campaign:', error);
       return NextResponse.json({ error: 'Database error' }, { status: 500 });
     }
 
-    const exists = logs && logs.length > 0;
+    const exists = !!data && data.length > 0;
 
     return NextResponse.json({
       exists,
       campaignId,
-      submittedAt: exists ? logs[0].created_at : null
+      submittedAt: exists ? data[0].submitted_at : null
     });
 
   } catch (error) {
@@ -40,3 +37,50 @@ export async function GET(request: NextRequest) {
     return NextResponse.json({ error: 'Internal server error' }, { status: 500 });
   }
 }
+
+// Maximum number of campaign IDs accepted in one bulk lookup
+const MAX_BULK_CIDS = 1000;
+
+// POST - Bulk lookup: which of the given campaign IDs have already been submitted
+export async function POST(request: NextRequest) {
+  try {
+    const { cids } = await request.json();
+
+    if (!Array.isArray(cids)) {
+      return NextResponse.json({ error: 'cids must be an array of campaign IDs' }, { status: 400 });
+    }
+
+    if (cids.length > MAX_BULK_CIDS) {
+      return NextResponse.json({ error: `Too many campaign IDs (max ${MAX_BULK_CIDS})` }, { status: 400 });
+    }
+
+    const campaignIds = [...new Set(cids.filter((cid: unknown) => typeof cid === 'string' && cid))];
+
+    if (campaignIds.length === 0) {
+      return NextResponse.json({ known: [], submittedAt: {} });
+    }
+
+    // Distinct IDs are computed in SQL so the response doesn't scale with the number of sends
+    const supabase = createClient(supabaseUrl, supabaseKey);
+    const { data, error } = await supabase.rpc('submitted_campaign_ids', { cids: campaignIds });
+
+    if (error) {
+      console.error('Error checking campaigns:', error);
+      return NextResponse.json({ error: 'Database error' }, { status: 500 });
+    }
+
+    const submittedAt: Record<string, string> = {};
+    (data || []).forEach((row: { campaign_id: string; submitted_at: string }) => {
+      submittedAt[row.campaign_id] = row.submitted_at;
+    });
+
+    return NextResponse.json({
+      known: Object.keys(submittedAt),
+      submittedAt
+    });
+
+  } catch (error) {
+    console.error('Error in bulk check-campaign:', error);
+    return NextResponse.json({ error: 'Internal server error' }, { status: 500 });
+  }
+}
@@ -11,14 +11,21 @@ export async function GET(request: NextRequest) {
   try {
     const { searchParams } = new URL(request.url);
     const limit = parseInt(searchParams.get('limit') || '50');
+    const status = searchParams.get('status');
 
     const supabase = createClient(supabaseUrl, supabaseKey);
-    const { data, error } = await supabase
+    let query = supabase
       .from('message_logs')
       .select('*')
       .order('created_at', { ascending: false })
       .limit(limit);
 
+    if (status) {
+      query = query.eq('status', status);
+    }
+
+    const { data, error } = await query;
+
     if (error) {
       return NextResponse.json({ error: 'Failed to fetch logs' }, { status: 500 });
     }
@@ -0,0 +1,31 @@
+import { NextResponse } from 'next/server';
+import { createClient } from '@supabase/supabase-js';
+
+export const runtime = 'edge';
+
+const supabaseUrl = process.env.NEXT_PUBLIC_SUPABASE_URL!;
+const supabaseKey = process.env.NEXT_PUBLIC_SUPABASE_ANON_KEY!;
+
+// GET - Distinct phone numbers that have received at least one successful send
+export async function GET() {
+  try {
+    const supabase = createClient(supabaseUrl, supabaseKey);
+
+    // Computed in SQL and returned as a single array, so the result isn't truncated by the row limit
+    const { data, error } = await supabase.rpc('successful_phone_numbers');
+
+    if (error) {
+      console.error('Error fetching successful phones:', error);
+      return NextResponse.json({ error: 'Failed to fetch successful phones' }, { status: 500 });
+    }
+
+    const phones: string[] = data || [];
+
+    return NextResponse.json({
+      phones,
+      count: phones.length
+    });
+  } catch (error) {
+    return NextResponse.json({ error: 'Internal server error' }, { status: 500 });
+  }
+}
@@ -18,37 +18,49 @@ export async function POST(request: NextRequest) {
       campaign_ids = [],
       subreddits_searched = [],
       error_message = null,
+      started_at = null,
+      completed_at = null,
+      duration_seconds = null,
+      metrics = null,
     } = body;
 
     if (!status) {
       return NextResponse.json({ error: 'Status is required' }, { status: 400 });
     }
 
-    if (!['success', 'failed', 'running'].includes(status)) {
+    if (!['success', 'failed', 'running', 'no_results'].includes(status)) {
       return NextResponse.json({
-        error: 'Status must be one of: success, failed, running'
+        error: 'Status must be one of: success, failed, running, no_results'
       }, { status: 400 });
     }
 
+    // A run that found nothing still succeeded; campaigns_found = 0 tells them apart
+    const storedStatus = status === 'no_results' ? 'success' : status;
+
     const supabase = createClient(supabaseUrl, supabaseKey);
 
     // For completed searches, set completed_at and calculate duration
     const now = new Date().toISOString();
     const logData: any = {
       search_type,
-      status,
+      status: storedStatus,
       campaigns_found,
       new_campaigns,
       campaign_ids,
       subreddits_searched,
       error_message,
-      started_at: now,
+      started_at: started_at || now,
+      metrics,
     };
 
-    // If the status is success or failed (not running), it's completed
-    if (status === 'success' || status === 'failed') {
-      logData.completed_at = now;
-      logData.duration_seconds = 0; // Will be updated if we track start time
+    // If the status is success or failed (not running), it's completed.
+    // Clients that time their runs send the real start/end; otherwise the
+    // log records the moment it was received.
+    if (storedStatus === 'success' || storedStatus === 'failed') {
+      logData.completed_at = completed_at || now;
+      logData.duration_seconds = typeof duration_seconds === 'number'
+        ? Math.round(duration_seconds)
+        : Math.max(0, Math.round((Date.parse(logData.completed_at) - Date.parse(logData.started_at)) / 1000)) || 0;
     }
 
     const { data, error } = await supabase
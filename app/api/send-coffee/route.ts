@@ -6,11 +6,64 @@ export const runtime = 'edge';
 const supabaseUrl = process.env.NEXT_PUBLIC_SUPABASE_URL!;
 const supabaseKey = process.env.NEXT_PUBLIC_SUPABASE_ANON_KEY!;
 
+// Cached campaign validation results are trusted for this long before Capital One is probed again
+const VALIDATION_TTL_SECONDS = parseInt(process.env.CAMPAIGN_VALIDATION_TTL_SECONDS || '21600');
+
+// Concurrent sends to Capital One per request. Callers can pass `concurrency`
+// or a `priority` hint; either is capped at MAX_SEND_CONCURRENCY.
+const DEFAULT_SEND_CONCURRENCY = parseInt(process.env.SEND_COFFEE_CONCURRENCY || '8');
+const MAX_SEND_CONCURRENCY = 32;
+const PRIORITY_CONCURRENCY: Record<string, number> = {
+  high: 16,
+  normal: DEFAULT_SEND_CONCURRENCY,
+  low: 2,
+};
+
+// Largest phone chunk accepted via `limit` (chunked sends keep each request well
+// inside the edge function time limit)
+const MAX_PHONE_CHUNK = 500;
+
+// Send results are written to message_logs in batches of this size while the chunk
+// runs, so a chunk retried after a client timeout skips phones already sent
+const LOG_FLUSH_SIZE = 10;
+
+// Status codes that mean "slow down and try again"
+const THROTTLE_STATUSES = new Set([429, 500, 502, 503, 504]);
+
+// Retry backoff: full jitter over an exponentially growing window
+const BACKOFF_BASE_MS = 1000;
+const BACKOFF_MAX_MS = 10000;
+
 interface CoffeeLink {
   cid: string;
   mc: string;
 }
 
+type ValidationResult = 'valid' | 'expired' | 'invalid';
+
+// The campaign's cached validation result, or null if there is none or it is older than the TTL.
+// A cached 'valid' is not trusted once the campaign has been flagged invalid or expired
+// some other way; it is probed again instead.
+function cachedValidation(campaign: any): ValidationResult | null {
+  if (!campaign?.validation_result || !campaign?.last_validated_at) {
+    return null;
+  }
+
+  if (campaign.validation_result === 'valid' && (campaign.is_valid === false || campaign.is_expired)) {
+    return null;
+  }
+
+  const ageMs = Date.now() - new Date(campaign.last_validated_at).getTime();
+  return ageMs <= VALIDATION_TTL_SECONDS * 1000 ? campaign.validation_result : null;
+}
+
+// 'expired' or 'invalid' if a failed validation is Capital One's definitive answer, else null
+function definitiveValidation(error?: string): Exclude<ValidationResult, 'valid'> | null {
+  if (error === 'Campaign Expired') return 'expired';
+  if (error === 'Invalid Campaign Id') return 'invalid';
+  return null;
+}
+
 function formatTimeAgo(date: Date): string {
   const now = new Date();
   const diffMs = now.getTime() - date.getTime();
@@ -59,6 +112,42 @@ async function sleep(ms: number): Promise<void> {
   return new Promise(resolve => setTimeout(resolve, ms));
 }
 
+// Delay before retry `attempt` (1-based); honors Retry-After (seconds) when present
+function backoffDelay(attempt: number, retryAfter?: string | null): number {
+  const retryAfterSeconds = retryAfter ? parseFloat(retryAfter) : NaN;
+  if (!isNaN(retryAfterSeconds) && retryAfterSeconds >= 0) {
+    return Math.min(retryAfterSeconds * 1000, BACKOFF_MAX_MS);
+  }
+  return Math.random() * Math.min(BACKOFF_BASE_MS * 2 ** (attempt - 1), BACKOFF_MAX_MS);
+}
+
+// Run `fn` over `items` with at most `limit` calls in flight; results keep the input order
+async function mapWithConcurrency<T, R>(
+  items: T[],
+  limit: number,
+  fn: (item: T, index: number) => Promise<R>
+): Promise<R[]> {
+  const results: R[] = new Array(items.length);
+  let next = 0;
+
+  const worker = async () => {
+    while (next < items.length) {
+      const index = next++;
+      results[index] = await fn(items[index], index);
+    }
+  };
+
+  await Promise.all(Array.from({ length: Math.min(limit, items.length) }, worker));
+  return results;
+}
+
+function resolveConcurrency(concurrency: unknown, priority: unknown): number {
+  const requested = typeof concurrency === 'number' && Number.isInteger(concurrency) && concurrency > 0
+    ? concurrency
+    : PRIORITY_CONCURRENCY[String(priority)] ?? DEFAULT_SEND_CONCURRENCY;
+  return Math.min(requested, MAX_SEND_CONCURRENCY);
+}
+
 async function validateCampaign(
   campaignId: string,
   marketingChannel: string,
@@ -126,10 +215,10 @@ async function sendCoffeeToPhone(
   platform: 'android' | 'apple',
   campaignId: string,
   marketingChannel: string,
-  maxRetries: number = 3,
-  retryDelayMs: number = 2000
+  maxRetries: number = 3
 ): Promise<{ success: boolean; error?: string }> {
   const apiPlatform = platform === 'apple' ? 'iOS' : 'android';
+  let error = 'Network error';
 
   for (let attempt = 1; attempt <= maxRetries; attempt++) {
     try {
@@ -148,29 +237,36 @@ async function sendCoffeeToPhone(
         }),
       });
 
-      const data = await response.json();
+      if (THROTTLE_STATUSES.has(response.status)) {
+        // Reported as a network error so retry_failed.py picks it up later
+        error = `Network error (HTTP ${response.status})`;
+        if (attempt < maxRetries) {
+          await sleep(backoffDelay(attempt, response.headers.get('retry-after')));
+        }
+        continue;
+      }
 
       if (response.status === 200 || response.ok) {
         return { success: true };
       }
 
+      const data = await response.json().catch(() => ({}));
       return { success: false, error: data.developerText || 'Failed to send' };
-    } catch (error) {
-      // Network error - retry with delay if we have attempts left
+    } catch (err) {
+      // Network error - retry with backoff if we have attempts left
+      error = 'Network error';
       if (attempt < maxRetries) {
-        await sleep(retryDelayMs);
-        continue;
+        await sleep(backoffDelay(attempt));
       }
-      return { success: false, error: 'Network error' };
     }
   }
 
-  return { success: false, error: 'Network error' };
+  return { success: false, error };
 }
 
 export async function POST(request: NextRequest) {
   try {
-    const { link, phoneOverride } = await request.json();
+    const { link, phoneOverride, concurrency, priority, after_id, limit } = await request.json();
 
     if (!link) {
       return NextResponse.json({ error: 'Link is required' }, { status: 400 });
@@ -182,32 +278,52 @@ export async function POST(request: NextRequest) {
       return NextResponse.json({ error: 'Invalid link format. Expected format: https://coffree.capitalone.com/sms/?cid=xxx&mc=yyy' }, { status: 400 });
     }
 
-    // Validate the campaign
     const supabase = createClient(supabaseUrl, supabaseKey);
-    const validation = await validateCampaign(parsed.cid, parsed.mc);
-    if (!validation.valid) {
-      // If the campaign is invalid or expired, update its status in the campaigns table
-      await supabase
-        .from('campaigns')
-        .update({
-          is_valid: false,
-          is_expired: validation.error === 'Campaign Expired'
-        })
-        .eq('campaign_id', parsed.cid);
 
-      return NextResponse.json({
-        error: validation.error,
-        type: validation.error === 'Invalid Campaign Id' ? 'invalid' : 'expired'
-      }, { status: 400 });
-    }
-
-    // Record this campaign in the campaigns table if it doesn't exist
     const { data: existingCampaign } = await supabase
       .from('campaigns')
       .select('*')
       .eq('campaign_id', parsed.cid)
       .single();
 
+    // Validate the campaign, unless it was validated within the TTL
+    const cached = cachedValidation(existingCampaign);
+    if (cached === 'expired' || cached === 'invalid') {
+      return NextResponse.json({
+        error: cached === 'expired' ? 'Campaign Expired' : 'Invalid Campaign Id',
+        type: cached,
+        cached: true
+      }, { status: 400 });
+    }
+
+    const validatedAt = new Date().toISOString();
+    if (!cached) {
+      const validation = await validateCampaign(parsed.cid, parsed.mc);
+      if (!validation.valid) {
+        // If the campaign is invalid or expired, update its status in the campaigns table.
+        // Only Capital One's invalid campaign (107) and expired (108) answers are cached;
+        // network failures and other errors (e.g. throttling) are probed again next call.
+        const result = definitiveValidation(validation.error);
+        await supabase
+          .from('campaigns')
+          .update({
+            is_valid: false,
+            is_expired: result === 'expired',
+            ...(result && {
+              validation_result: result,
+              last_validated_at: validatedAt,
+            }),
+          })
+          .eq('campaign_id', parsed.cid);
+
+        return NextResponse.json({
+          error: validation.error,
+          type: result ?? 'error'
+        }, { status: 400 });
+      }
+    }
+
+    // Record this campaign in the campaigns table if it doesn't exist
     if (!existingCampaign) {
       // This is a new manually-added campaign
       await supabase
@@ -219,17 +335,30 @@ export async function POST(request: NextRequest) {
           source: 'manual',
           is_valid: true,
           is_expired: false,
+          validation_result: 'valid',
+          last_validated_at: validatedAt,
         });
-    } else if (!existingCampaign.first_submitted_at) {
-      // Update the first submission timestamp
+    } else if (!existingCampaign.first_submitted_at || !cached) {
+      // Update the first submission timestamp and/or the fresh validation result
       await supabase
         .from('campaigns')
-        .update({ first_submitted_at: new Date().toISOString() })
+        .update({
+          ...(!existingCampaign.first_submitted_at && { first_submitted_at: validatedAt }),
+          ...(!cached && {
+            is_valid: true,
+            is_expired: false,
+            validation_result: 'valid',
+            last_validated_at: validatedAt,
+          }),
+        })
         .eq('campaign_id', parsed.cid);
     }
 
-    // Get phone numbers - either the override or all from Supabase
+    // Get phone numbers - either the override, or all (or one chunk) from Supabase
     let phones;
+    let afterId = 0;
+    let hasMore = false;
+    let totalPhones = 1;
     if (phoneOverride) {
       // If phoneOverride is provided, find that specific phone in the database
       const { data: phoneData, error: fetchError } = await supabase
@@ -244,71 +373,129 @@ export async function POST(request: NextRequest) {
 
       phones = [phoneData];
     } else {
-      // Get all phone numbers from Supabase
-      const { data: allPhones, error: fetchError } = await supabase
+      const chunkSize = Number.isInteger(limit) && limit > 0 ? Math.min(limit, MAX_PHONE_CHUNK) : null;
+      afterId = Number.isInteger(after_id) && after_id > 0 ? after_id : 0;
+
+      const { count, error: countError } = await supabase
         .from('phone_numbers')
-        .select('*');
+        .select('id', { count: 'exact', head: true });
 
-      if (fetchError) {
+      if (countError) {
         return NextResponse.json({ error: 'Failed to fetch phone numbers' }, { status: 500 });
       }
 
-      if (!allPhones || allPhones.length === 0) {
+      if (!count) {
         return NextResponse.json({ error: 'No phone numbers subscribed' }, { status: 400 });
       }
 
-      phones = allPhones;
+      totalPhones = count;
+
+      // Chunks are keyed by the last phone id of the previous chunk, so they stay
+      // stable while phones are added or removed between calls. One extra row is
+      // fetched to tell whether another chunk follows.
+      let query = supabase
+        .from('phone_numbers')
+        .select('*')
+        .order('id', { ascending: true })
+        .gt('id', afterId);
+
+      if (chunkSize) {
+        query = query.limit(chunkSize + 1);
+      }
+
+      const { data, error: fetchError } = await query;
+
+      if (fetchError) {
+        return NextResponse.json({ error: 'Failed to fetch phone numbers' }, { status: 500 });
+      }
+
+      const allPhones = data || [];
+      hasMore = chunkSize !== null && allPhones.length > chunkSize;
+      phones = hasMore ? allPhones.slice(0, chunkSize as number) : allPhones;
     }
 
-    // Check which phones have already received this campaign successfully
-    const { data: existingLogs } = await supabase
+    // Check which of these phones have already received this campaign successfully
+    let existingLogsQuery = supabase
       .from('message_logs')
       .select('phone_number')
       .eq('campaign_id', parsed.cid)
       .eq('status', 'success');
 
+    if (phoneOverride || limit) {
+      existingLogsQuery = existingLogsQuery.in('phone_number', phones.map((p: any) => p.phone));
+    }
+
+    const { data: existingLogs } = phones.length > 0 ? await existingLogsQuery : { data: [] };
+
     const alreadyReceivedPhones = new Set(
       existingLogs?.map(log => log.phone_number) || []
     );
 
-    // Send to phone numbers that haven't received this campaign yet
-    const results = await Promise.all(
-      phones.map(async (phoneRecord) => {
-        // Skip if this phone already successfully received this campaign
-        if (alreadyReceivedPhones.has(phoneRecord.phone)) {
-          return {
-            phone: phoneRecord.phone,
-            success: true,
-            skipped: true,
-            error: 'Already received this campaign',
-          };
+    // Send to phone numbers that haven't received this campaign yet, a bounded number at a time
+    const sendConcurrency = resolveConcurrency(concurrency, priority);
+    let logRows: any[] = [];
+
+    const flushLogs = async () => {
+      const rows = logRows;
+      logRows = [];
+      if (rows.length > 0) {
+        const { error: logError } = await supabase.from('message_logs').insert(rows);
+        if (logError) {
+          console.error('Error logging sends:', logError);
         }
+      }
+    };
 
-        const result = await sendCoffeeToPhone(
-          phoneRecord.phone,
-          phoneRecord.platform,
-          parsed.cid,
-          parsed.mc
-        );
-
-        // Log the result
-        await supabase.from('message_logs').insert({
-          campaign_id: parsed.cid,
-          marketing_channel: parsed.mc,
-          link: link,
-          phone_number: phoneRecord.phone,
-          status: result.success ? 'success' : 'failed',
-          error_message: result.error,
-        });
-
+    const results = await mapWithConcurrency(phones, sendConcurrency, async (phoneRecord: any) => {
+      // Skip if this phone already successfully received this campaign
+      if (alreadyReceivedPhones.has(phoneRecord.phone)) {
         return {
           phone: phoneRecord.phone,
-          success: result.success,
-          skipped: false,
-          error: result.error,
+          success: true,
+          skipped: true,
+          error: 'Already received this campaign',
         };
-      })
-    );
+      }
+
+      const result = await sendCoffeeToPhone(
+        phoneRecord.phone,
+        phoneRecord.platform,
+        parsed.cid,
+        parsed.mc
+      );
+
+      logRows.push({
+        campaign_id: parsed.cid,
+        marketing_channel: parsed.mc,
+        link: link,
+        phone_number: phoneRecord.phone,
+        status: result.success ? 'success' : 'failed',
+        error_message: result.error,
+      });
+      if (logRows.length >= LOG_FLUSH_SIZE) {
+        await flushLogs();
+      }
+
+      return {
+        phone: phoneRecord.phone,
+        success: result.success,
+        skipped: false,
+        error: result.error,
+      };
+    });
+
+    // Log the results still buffered
+    await flushLogs();
+
+    // The last chunk of a full fan-out marks the campaign as submitted. Until then
+    // /api/check-campaign does not report it, so an interrupted fan-out is resumed.
+    if (!phoneOverride && !hasMore) {
+      await supabase
+        .from('campaigns')
+        .update({ fanout_completed_at: new Date().toISOString() })
+        .eq('campaign_id', parsed.cid)
+        .is('fanout_completed_at', null);
+    }
 
     const successCount = results.filter(r => r.success && !r.skipped).length;
     const skippedCount = results.filter(r => r.skipped).length;
@@ -325,16 +512,21 @@ export async function POST(request: NextRequest) {
       );
 
       if (hasCampaignError) {
+        const isExpired = failedResults.some(r => r.error?.toLowerCase().includes('expired'));
         await supabase
           .from('campaigns')
           .update({
             is_valid: false,
-            is_expired: failedResults.some(r => r.error?.toLowerCase().includes('expired'))
+            is_expired: isExpired,
+            validation_result: isExpired ? 'expired' : 'invalid',
+            last_validated_at: new Date().toISOString(),
           })
           .eq('campaign_id', parsed.cid);
       }
     }
 
+    const nextAfterId = phones.length > 0 ? phones[phones.length - 1].id : afterId;
+
     const messageParts = [];
     if (successCount > 0) messageParts.push(`Sent to ${successCount} phone(s)`);
     if (skippedCount > 0) messageParts.push(`${skippedCount} skipped (already received)`);
@@ -350,7 +542,14 @@ export async function POST(request: NextRequest) {
         sent: successCount,
         skipped: skippedCount,
         failed: failedCount,
-        total: phones.length
+        total: phones.length,
+        concurrency: sendConcurrency
+      },
+      progress: {
+        after_id: afterId,
+        next_after_id: nextAfterId,
+        total: totalPhones,
+        done: !hasMore
       }
     });
 
@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+"""
+Fakes - Local stand-ins for Reddit, the /api/* backend, PostgREST, Capital One and numverify
+
+Each fake is a threaded HTTP server on 127.0.0.1 that generates its data
+deterministically from a scale, so the Python tools can be run end to end
+without network access. Every request is counted per service and route.
+"""
+
+import json
+import random
+import re
+import threading
+import time
+from bisect import bisect_right
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+COFFREE_LINK = 'https://coffree.capitalone.com/sms/?cid={cid}&mc=BENCH'
+
+
+class RequestCounter:
+    """Thread-safe request counts keyed by (service, route)"""
+
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def add(self, service: str, route: str):
+        with self._lock:
+            self._counts[(service, route)] += 1
+
+    def snapshot(self) -> Counter:
+        with self._lock:
+            return Counter(self._counts)
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+class FakeServer:
+    """
+    Base class: subclasses implement `handle(method, path, query, body)`
+    returning (status, payload, headers) and set `service`.
+    """
+
+    service = 'fake'
+
+    def __init__(self, counter: RequestCounter, latency: float = 0.0):
+        self.counter = counter
+        self.latency = latency
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'FakeServer':
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _dispatch(self, method):
+                parsed = urlparse(self.path)
+                length = int(self.headers.get('Content-Length') or 0)
+                raw = self.rfile.read(length) if length else b''
+                try:
+                    body = json.loads(raw) if raw and raw[:1] in (b'{', b'[') else parse_qs(raw.decode())
+                except ValueError:
+                    body = None
+
+                if fake.latency:
+                    time.sleep(fake.latency)
+
+                status, payload, headers = fake.handle(method, parsed.path, parse_qs(parsed.query), body)
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._dispatch('GET')
+
+            def do_POST(self):
+                self._dispatch('POST')
+
+            def do_PATCH(self):
+                self._dispatch('PATCH')
+
+            def do_DELETE(self):
+                self._dispatch('DELETE')
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def count(self, route: str):
+        self.counter.add(self.service, route)
+
+    def handle(self, method: str, path: str, query: dict, body):
+        raise NotImplementedError
+
+
+def base36(number: int) -> str:
+    digits = '0123456789abcdefghijklmnopqrstuvwxyz'
+    out = ''
+    while True:
+        number, rem = divmod(number, 36)
+        out = digits[rem] + out
+        if not number:
+            return out
+
+
+class FakeReddit(FakeServer):
+    """
+    PRAW-compatible Reddit: OAuth token, subreddit search and comment trees
+
+    Every subreddit has `posts` posts, newest first, one minute apart. Every
+    `link_every`-th post has a coffree link in its body; the post halfway
+    between two of those has one only in its comments. The broader search
+    matches both kinds, so comment trees are loaded for the latter.
+    Point PRAW here with oauth_url/reddit_url in a praw.ini in its working directory.
+    """
+
+    service = 'reddit'
+
+    # Post ids encode the subreddit so every subreddit has its own posts
+    ID_SPAN = 10 ** 8
+
+    def __init__(self, counter: RequestCounter, posts: int = 100, comments_per_post: int = 10,
+                 link_every: int = 10, campaigns: int = 50, latency: float = 0.0):
+        super().__init__(counter, latency)
+        self.posts = posts
+        self.comments_per_post = comments_per_post
+        self.link_every = max(2, link_every)
+        self.campaigns = max(1, campaigns)
+        self.now = time.time()
+        self._subreddits = []
+        self._lock = threading.Lock()
+
+    def _subreddit_index(self, subreddit: str) -> int:
+        with self._lock:
+            if subreddit not in self._subreddits:
+                self._subreddits.append(subreddit)
+            return self._subreddits.index(subreddit)
+
+    def _post_id(self, subreddit: str, i: int) -> str:
+        return base36(self._subreddit_index(subreddit) * self.ID_SPAN + i + 1)
+
+    def _campaign(self, i: int) -> str:
+        return f"bench{(i // self.link_every) % self.campaigns:05d}"
+
+    def _post(self, subreddit: str, i: int) -> dict:
+        post_id = self._post_id(subreddit, i)
+        has_link = i % self.link_every == 0
+        selftext = f"Free coffee! {COFFREE_LINK.format(cid=self._campaign(i))}" if has_link else 'Free coffee, link below'
+        return {
+            'kind': 't3',
+            'data': {
+                'id': post_id,
+                'name': f't3_{post_id}',
+                'title': 'Capital One coffee',
+                'selftext': selftext,
+                'url': f'https://www.reddit.com/r/{subreddit}/comments/{post_id}/',
+                'permalink': f'/r/{subreddit}/comments/{post_id}/bench/',
+                'created_utc': self.now - i * 60,
+                'author': 'bench_user',
+                'subreddit': subreddit,
+                'num_comments': self.comments_per_post,
+                'is_self': True,
+            }
+        }
+
+    def _comment(self, subreddit: str, post_index: int, j: int) -> dict:
+        post_id = self._post_id(subreddit, post_index)
+        comment_id = f"{post_id}c{j}"
+        has_link = post_index % self.link_every == self.link_every // 2 and j == 0
+        body = f"Here: {COFFREE_LINK.format(cid=self._campaign(post_index))}" if has_link else 'thanks!'
+        return {
+            'kind': 't1',
+            'data': {
+                'id': comment_id,
+                'name': f't1_{comment_id}',
+                'body': body,
+                'author': 'bench_user',
+                'created_utc': self.now - post_index * 60 + j,
+                'permalink': f'/r/{subreddit}/comments/{post_id}/bench/{comment_id}/',
+                'link_id': f't3_{post_id}',
+                'parent_id': f't3_{post_id}',
+                'subreddit': subreddit,
+                'replies': '',
+            }
+        }
+
+    def _matches(self, query: str, i: int) -> bool:
+        if 'coffree.capitalone.com' in query and ' OR ' not in query:
+            return i % self.link_every == 0
+        return i % self.link_every in (0, self.link_every // 2)
+
+    def handle(self, method, path, query, body):
+        headers = {
+            'x-ratelimit-remaining': '1000',
+            'x-ratelimit-used': '0',
+            'x-ratelimit-reset': '600',
+        }
+
+        if path == '/api/v1/access_token':
+            self.count('token')
+            return 200, {'access_token': 'bench', 'token_type': 'bearer', 'expires_in': 86400, 'scope': '*'}, headers
+
+        match = re.match(r'^/r/([^/]+)/search/?$', path)
+        if match:
+            self.count('search')
+            # Multireddits (r/a+b) interleave their subreddits' posts, newest first
+            subreddits = match.group(1).split('+')
+            limit = min(int(query.get('limit', ['25'])[0]), 100)
+            after = query.get('after', [None])[0]
+            q = query.get('q', [''])[0]
+
+            # Position in the merged listing is (post index, subreddit position)
+            position = 0
+            if after:  # Resume after the `after` post
+                sub_index, post_number = divmod(int(after[3:], 36), self.ID_SPAN)
+                after_subreddit = self._subreddits[sub_index]
+                order = subreddits.index(after_subreddit) if after_subreddit in subreddits else 0
+                position = (post_number - 1) * len(subreddits) + order + 1
+
+            children = []
+            end = self.posts * len(subreddits)
+            while position < end and len(children) < limit:
+                i, order = divmod(position, len(subreddits))
+                if self._matches(q, i):
+                    children.append(self._post(subreddits[order], i))
+                position += 1
+            next_after = children[-1]['data']['name'] if children and position < end else None
+            return 200, {'kind': 'Listing', 'data': {'after': next_after, 'before': None, 'children': children}}, headers
+
+        match = re.match(r'^/comments/([^/]+)/?', path)
+        if match:
+            self.count('comments')
+            sub_index, post_number = divmod(int(match.group(1), 36), self.ID_SPAN)
+            post_index = post_number - 1
+            subreddit = self._subreddits[sub_index]
+            post = self._post(subreddit, post_index)
+            comments = [self._comment(subreddit, post_index, j) for j in range(self.comments_per_post)]
+            return 200, [
+                {'kind': 'Listing', 'data': {'after': None, 'before': None, 'children': [post]}},
+                {'kind': 'Listing', 'data': {'after': None, 'before': None, 'children': comments}},
+            ], headers
+
+        self.count('other')
+        return 404, {'message': 'Not Found', 'error': 404}, headers
+
+
+class FakeApi(FakeServer):
+    """The Next.js /api/* backend, with campaigns kept in memory"""
+
+    service = 'api'
+
+    def __init__(self, counter: RequestCounter, phones: int = 10, successful_fraction: float = 0.0,
+                 latency: float = 0.0):
+        super().__init__(counter, latency)
+        self.phones = [{'id': i + 1, 'phone': f"555{i:07d}", 'platform': 'apple' if i % 2 else 'android'}
+                       for i in range(phones)]
+        self.successful = {p['phone'] for p in self.phones[:int(phones * successful_fraction)]}
+        self.campaigns = {}
+        self.submitted = set()
+        self._lock = threading.Lock()
+
+    def handle(self, method, path, query, body):
+        self.count(f"{method} {path}")
+
+        if path == '/api/check-campaign' and method == 'POST':
+            with self._lock:
+                known = [cid for cid in body.get('cids', []) if cid in self.submitted]
+            return 200, {'known': known, 'submittedAt': {cid: '2024-01-01T00:00:00+00:00' for cid in known}}, None
+
+        if path == '/api/campaigns' and method == 'POST':
+            items = body if isinstance(body, list) else body.get('campaigns', [body])
+            results = []
+            with self._lock:
+                for item in items:
+                    cid = parse_qs(urlparse(item['full_link']).query).get('cid', [None])[0]
+                    created = cid not in self.campaigns
+                    self.campaigns.setdefault(cid, {
+                        'campaign_id': cid,
+                        'full_link': item['full_link'],
+                        'validation_result': 'valid',
+                        'last_validated_at': time.strftime('%Y-%m-%dT%H:%M:%S+00:00', time.gmtime()),
+                    })
+                    results.append({'full_link': item['full_link'], 'campaign_id': cid, 'created': created,
+                                    'existing': not created, 'campaign': self.campaigns[cid]})
+            return 200, {'success': True, 'results': results}, None
+
+        if path == '/api/send-coffee' and method == 'POST':
+            cid = parse_qs(urlparse(body['link']).query).get('cid', [None])[0]
+            # Phone ids are 1..n, so the phones after `after_id` start at that index
+            after_id = body.get('after_id', 0)
+            limit = body.get('limit') or len(self.phones)
+            chunk = self.phones[after_id:after_id + limit]
+            next_after_id = chunk[-1]['id'] if chunk else after_id
+            if next_after_id >= len(self.phones):
+                with self._lock:
+                    self.submitted.add(cid)  # Fan-out complete
+            return 200, {
+                'success': True,
+                'message': f'Sent to {len(chunk)} phone(s)',
+                'stats': {'sent': len(chunk), 'skipped': 0, 'failed': 0, 'total': len(chunk)},
+                'progress': {'after_id': after_id, 'next_after_id': next_after_id, 'total': len(self.phones),
+                             'done': next_after_id >= len(self.phones)},
+            }, None
+
+        if path == '/api/search-logs' and method == 'POST':
+            return 200, {'success': True}, None
+
+        if path == '/api/phone' and method == 'GET':
+            return 200, {'phones': self.phones}, None
+
+        if path == '/api/phone' and method == 'DELETE':
+            return 200, {'success': True}, None
+
+        if path == '/api/logs/successful-phones':
+            return 200, {'phones': sorted(self.successful)}, None
+
+        if path == '/api/logs':
+            return 200, {'logs': [{'campaign_id': 'bench00000', 'marketing_channel': 'BENCH'}]}, None
+
+        return 404, {'error': 'Not found'}, None
+
+
+class FakePostgrest(FakeServer):
+    """
+    The Supabase REST endpoints retry_failed.py uses: the pending_deliveries
+    RPC over `pending` generated (campaign, phone) pairs, message_logs
+    inserts and campaigns updates
+    """
+
+    service = 'postgrest'
+
+    def __init__(self, counter: RequestCounter, pending: int = 10, phones_per_campaign: int = 100,
+                 latency: float = 0.0):
+        super().__init__(counter, latency)
+        per = max(1, phones_per_campaign)
+        self.keys = [(f"bench{i // per:05d}", f"555{i % per:07d}") for i in range(pending)]
+        self.inserted = 0
+
+    def handle(self, method, path, query, body):
+        self.count(f"{method} {path}")
+
+        if path == '/rest/v1/rpc/pending_deliveries':
+            after = (body.get('after_campaign', ''), body.get('after_phone', ''))
+            start = bisect_right(self.keys, after)
+            rows = [{
+                'campaign_id': cid,
+                'marketing_channel': 'BENCH',
+                'full_link': COFFREE_LINK.format(cid=cid),
+                'phone': phone,
+                'platform': 'android',
+                'last_error': None,
+                'previously_failed': False,
+                'validation_result': 'valid',
+                'last_validated_at': None,
+            } for cid, phone in self.keys[start:start + body.get('page_size', 1000)]]
+            return 200, rows, None
+
+        if path == '/rest/v1/message_logs' and method == 'POST':
+            rows = body if isinstance(body, list) else [body]
+            self.inserted += len(rows)
+            return 201, rows, None
+
+        if path == '/rest/v1/campaigns':
+            return 200, [], None
+
+        return 404, {'message': 'Not found'}, None
+
+
+class FakeCapitalOne(FakeServer):
+    """
+    The text-pass endpoint, with per-request latency, a random error rate
+    (answered as an invalid phone) and 429s above `throttle_rps` requests per second
+    """
+
+    service = 'capitalone'
+
+    def __init__(self, counter: RequestCounter, latency: float = 0.05, error_rate: float = 0.0,
+                 throttle_rps: float = 0.0, retry_after: float = 1.0, seed: int = 0):
+        super().__init__(counter, latency)
+        self.error_rate = error_rate
+        self.throttle_rps = throttle_rps
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self._recent = deque()
+        self._lock = threading.Lock()
+
+    def handle(self, method, path, query, body):
+        now = time.monotonic()
+        with self._lock:
+            while self._recent and now - self._recent[0] > 1.0:
+                self._recent.popleft()
+            self._recent.append(now)
+            throttled = self.throttle_rps and len(self._recent) > self.throttle_rps
+            failed = self._random.random() < self.error_rate
+
+        if throttled:
+            self.count('429')
+            return 429, {'developerText': 'Too Many Requests'}, {'Retry-After': str(self.retry_after)}
+
+        if failed:
+            self.count('error')
+            return 400, {'id': 101, 'developerText': 'Invalid phone number', 'userText': ''}, None
+
+        self.count('ok')
+        return 200, {}, None
+
+
+class FakeNumverify(FakeServer):
+    """numverify's validate endpoint; numbers ending in 0 are invalid"""
+
+    service = 'numverify'
+
+    def handle(self, method, path, query, body):
+        self.count('validate')
+        number = query.get('number', [''])[0]
+        return 200, {
+            'valid': not number.endswith('0'),
+            'number': f"1{number}",
+            'international_format': f"+1{number}",
+            'country_code': 'US',
+            'country_name': 'United States of America',
+            'carrier': 'Bench Wireless',
+            'line_type': 'mobile',
+        }, None
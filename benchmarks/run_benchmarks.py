@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Run Benchmarks - Time the Python tools end to end against local fakes
+
+Starts the fake servers from fakes.py, runs each tool as a subprocess with
+its endpoints pointed at them, and reports wall time, requests per service
+and peak RSS for every scenario at each scale.
+
+Usage:
+    python3 benchmarks/run_benchmarks.py                  # scales 10 and 1000
+    python3 benchmarks/run_benchmarks.py --scale 100000 --tools retry_failed
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from fakes import (
+    FakeApi,
+    FakeCapitalOne,
+    FakeNumverify,
+    FakePostgrest,
+    FakeReddit,
+    RequestCounter,
+)
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_SCALES = [10, 1000]
+
+# Rates passed to the tools so the fakes, not the production quotas, bound throughput
+BENCH_RATE = 500
+BENCH_CONCURRENCY = 16
+
+# Accepted by supabase-py's key check; the fake PostgREST ignores it
+FAKE_SUPABASE_KEY = 'eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.bench'
+
+TOOLS = ['coffree_finder', 'retry_failed', 'cleanup_phones', 'validate_phones']
+
+
+def run_tool(script: str, args: List[str], env: Dict[str, str], log_path: str) -> Dict:
+    """
+    Run one tool to completion
+
+    Returns:
+        Dict with exit code, wall time (s) and peak RSS (MB) of the process
+    """
+    with open(log_path, 'w') as log:
+        started = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, os.path.join(REPO_ROOT, script)] + args,
+            env=env,
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            cwd=os.path.dirname(log_path),
+        )
+        _, status, usage = os.wait4(process.pid, 0)
+        wall = time.perf_counter() - started
+
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return {
+        'exit_code': process.returncode,
+        'wall_seconds': round(wall, 3),
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        'peak_rss_mb': round(usage.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1),
+    }
+
+
+def scenarios(scale: int, workdir: str, servers: Dict, tools: List[str]):
+    """
+    Yield (name, script, args, env overrides) for each scenario at `scale`
+
+    `scale` is the number of posts per subreddit for the finder, pending
+    deliveries for retry_failed and subscribed phones for the phone tools.
+    """
+    api = servers['api'].url
+    state_file = os.path.join(workdir, 'finder_state.json')
+    cache_file = os.path.join(workdir, 'finder_cache.sqlite3')
+
+    if 'coffree_finder' in tools:
+        # PRAW only reads its endpoints from praw.ini; the tools run with workdir as cwd
+        with open(os.path.join(workdir, 'praw.ini'), 'w') as f:
+            f.write(f"[DEFAULT]\noauth_url={servers['reddit'].url}\nreddit_url={servers['reddit'].url}\n")
+
+        finder_env = {
+            'API_BASE_URL': api,
+            'REDDIT_CLIENT_ID': 'bench',
+            'REDDIT_CLIENT_SECRET': 'bench',
+            'PRAW_ALLOW_ENDPOINT_OVERRIDE': '1',
+            'REDDIT_REQUESTS_PER_MINUTE': str(BENCH_RATE * 60),
+        }
+        finder_args = ['--timeframe', 'all', '--incremental', '--auto-submit', '--api-url', api,
+                       '--state-file', state_file, '--cache-file', cache_file]
+        # First run has no cursor, so it pages through the whole corpus
+        yield 'coffree_finder (cold)', 'coffree_finder.py', finder_args, finder_env
+        # Second run resumes from the saved cursors and comment cache
+        yield 'coffree_finder (incremental)', 'coffree_finder.py', finder_args, finder_env
+
+    if 'retry_failed' in tools:
+        if importlib.util.find_spec('supabase') is None:
+            print("⚠️  Skipping retry_failed: the supabase package is not installed")
+        else:
+            yield 'retry_failed', 'retry_failed.py', [
+                '--yes', '--concurrency', str(BENCH_CONCURRENCY), '--rate', str(BENCH_RATE)
+            ], {
+                'NEXT_PUBLIC_SUPABASE_URL': servers['postgrest'].url,
+                'NEXT_PUBLIC_SUPABASE_ANON_KEY': FAKE_SUPABASE_KEY,
+                'CAPITAL_ONE_API_URL': servers['capitalone'].url,
+                'MESSAGE_LOG_SPILL_FILE': os.path.join(workdir, 'spill.jsonl'),
+            }
+
+    if 'cleanup_phones' in tools:
+        yield 'cleanup_phones', 'cleanup_phones.py', [
+            '--api-url', api, '--concurrency', str(BENCH_CONCURRENCY), '--rate', str(BENCH_RATE),
+            '--checkpoint-file', os.path.join(workdir, 'cleanup_checkpoint.json')
+        ], {
+            'API_BASE_URL': api,
+            'CAPITAL_ONE_API_URL': servers['capitalone'].url,
+        }
+
+    if 'validate_phones' in tools:
+        validate_args = [
+            '--api-url', api, '--concurrency', str(BENCH_CONCURRENCY), '--rate', str(BENCH_RATE),
+            '--cache-file', os.path.join(workdir, 'phone_cache.sqlite3')
+        ]
+        validate_env = {
+            'API_BASE_URL': api,
+            'NUMVERIFY_API_URL': f"{servers['numverify'].url}/api/validate",
+        }
+        yield 'validate_phones (cold)', 'validate_phones.py', validate_args, validate_env
+        yield 'validate_phones (cached)', 'validate_phones.py', validate_args, validate_env
+
+
+def run_scale(scale: int, options, tools: List[str]) -> List[Dict]:
+    """Start fresh fakes sized for `scale` and run every scenario against them"""
+    counter = RequestCounter()
+    servers = {
+        'reddit': FakeReddit(counter, posts=scale, comments_per_post=options.comments_per_post,
+                             latency=options.reddit_latency),
+        'api': FakeApi(counter, phones=scale),
+        'postgrest': FakePostgrest(counter, pending=scale),
+        'capitalone': FakeCapitalOne(counter, latency=options.latency, error_rate=options.error_rate,
+                                     throttle_rps=options.throttle_rps),
+        'numverify': FakeNumverify(counter, latency=options.latency),
+    }
+    for server in servers.values():
+        server.start()
+
+    results = []
+    try:
+        with tempfile.TemporaryDirectory(prefix=f'coffree-bench-{scale}-') as workdir:
+            for index, (name, script, args, overrides) in enumerate(scenarios(scale, workdir, servers, tools)):
+                counter.reset()
+                env = dict(os.environ, **overrides)
+                log_path = os.path.join(workdir, f'{index:02d}.log')
+
+                print(f"▶️  [{scale}] {name}...", flush=True)
+                result = run_tool(script, args, env, log_path)
+
+                requests_by_service = {}
+                for (service, route), count in sorted(counter.snapshot().items()):
+                    requests_by_service.setdefault(service, {})[route] = count
+
+                if result['exit_code'] != 0 and options.show_failures:
+                    with open(log_path) as f:
+                        print(''.join(f.readlines()[-20:]))
+
+                results.append(dict(result, scale=scale, scenario=name, requests=requests_by_service))
+    finally:
+        for server in servers.values():
+            server.stop()
+
+    return results
+
+
+def print_report(results: List[Dict]):
+    """Print one row per scenario with its request totals per service"""
+    print(f"\n{'='*100}")
+    print(f"{'Scenario':<32} {'Scale':>7} {'Exit':>5} {'Wall (s)':>9} {'RSS (MB)':>9}  Requests")
+    print(f"{'='*100}")
+    for result in results:
+        requests_summary = ', '.join(
+            f"{service}={sum(routes.values())}" for service, routes in result['requests'].items()
+        )
+        print(f"{result['scenario']:<32} {result['scale']:>7} {result['exit_code']:>5} "
+              f"{result['wall_seconds']:>9.2f} {result['peak_rss_mb']:>9.1f}  {requests_summary}")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark the Coffree Python tools against local fake servers'
+    )
+    parser.add_argument(
+        '--scale',
+        type=int,
+        nargs='+',
+        default=DEFAULT_SCALES,
+        help=f'Input sizes to run (default: {" ".join(map(str, DEFAULT_SCALES))}); 100000 takes a while'
+    )
+    parser.add_argument(
+        '--tools',
+        nargs='+',
+        choices=TOOLS,
+        default=TOOLS,
+        help='Tools to benchmark (default: all)'
+    )
+    parser.add_argument(
+        '--latency',
+        type=float,
+        default=0.02,
+        help='Seconds the fake Capital One and numverify take per request (default: 0.02)'
+    )
+    parser.add_argument(
+        '--reddit-latency',
+        type=float,
+        default=0.0,
+        help='Seconds the fake Reddit takes per request (default: 0)'
+    )
+    parser.add_argument(
+        '--error-rate',
+        type=float,
+        default=0.0,
+        help='Fraction of Capital One requests answered with an error (default: 0)'
+    )
+    parser.add_argument(
+        '--throttle-rps',
+        type=float,
+        default=0.0,
+        help='Capital One answers 429 above this many requests per second (default: never)'
+    )
+    parser.add_argument(
+        '--comments-per-post',
+        type=int,
+        default=10,
+        help='Comments in every fake Reddit comment tree (default: 10)'
+    )
+    parser.add_argument(
+        '--json',
+        help='Also write the results to this JSON file'
+    )
+    parser.add_argument(
+        '--show-failures',
+        action='store_true',
+        help='Print the tail of the output of tools that exit non-zero'
+    )
+    options = parser.parse_args()
+
+    results = []
+    for scale in options.scale:
+        results.extend(run_scale(scale, options, options.tools))
+
+    print_report(results)
+
+    if options.json:
+        with open(options.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"📝 Results written to {options.json}")
+
+    if any(result['exit_code'] != 0 for result in results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
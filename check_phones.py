@@ -7,6 +7,8 @@ import requests
 import os
 from datetime import datetime
 
+from profiling import add_profile_argument, profile
+
 # Configuration
 API_BASE_URL = os.getenv('API_BASE_URL', 'http://localhost:3001')
 
@@ -101,13 +103,15 @@ def main():
         action='store_true',
         help='Show only last 4 digits of phone numbers'
     )
+    add_profile_argument(parser)
 
     args = parser.parse_args()
 
     # Set API URL from argument
     os.environ['API_BASE_URL'] = args.api_url
 
-    check_phones(anonymize=args.anonymize)
+    with profile(args.profile, 'check_phones'):
+        check_phones(anonymize=args.anonymize)
 
 
 if __name__ == '__main__':
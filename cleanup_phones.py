@@ -5,17 +5,89 @@ Cleanup Phone Numbers - Validate and remove phones that haven't successfully rec
 
 import requests
 import os
+import json
 import time
-from datetime import datetime
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError
+
+from profiling import add_profile_argument, profile
+from rate_limiter import AdaptiveRateLimiter, parse_retry_after
 
 # Configuration
 API_BASE_URL = os.getenv('API_BASE_URL', 'http://localhost:3001')
 
+# Capital One API
+CAPITAL_ONE_API = os.getenv('CAPITAL_ONE_API_URL', 'https://api.capitalone.com/protected/24565/retail/digital-offers/text-pass')
+
+# Probe scheduler defaults: probes in flight and the starting probe rate
+# (one every 1.5 seconds) that adapts to 429s and latency
+DEFAULT_CONCURRENCY = 4
+DEFAULT_RATE = 1 / 1.5
+
+# Status codes that mean "slow down and try again"
+THROTTLE_STATUSES = {429, 500, 502, 503, 504}
+
+# Probes slower than this count as congestion and slow the scheduler down
+SLOW_PROBE_SECONDS = 5.0
+
+# Probe outcomes are checkpointed here so an interrupted run resumes where it stopped
+CHECKPOINT_FILE = os.getenv('CLEANUP_CHECKPOINT_FILE', '.cleanup_phones_checkpoint.json')
+CHECKPOINT_EVERY = 10
+
+
+def create_session(pool_size: int) -> requests.Session:
+    """Create a keep-alive session holding at most `pool_size` connections per host"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, pool_block=True)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def load_checkpoint(path: str, campaign_id: str) -> dict:
+    """
+    Load probe outcomes saved by an interrupted run
+
+    Returns:
+        Dict mapping phone to 'valid', 'invalid' or 'error' (empty if none or
+        the checkpoint was made with a different campaign)
+    """
+    try:
+        with open(path) as f:
+            checkpoint = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        print(f"⚠️  Could not read checkpoint {path}: {e}")
+        return {}
+
+    if checkpoint.get('campaign_id') != campaign_id:
+        print(f"ℹ️  Ignoring checkpoint for a different campaign ({checkpoint.get('campaign_id')})")
+        return {}
+    return checkpoint.get('outcomes', {})
 
-def get_all_phones():
+
+def save_checkpoint(path: str, campaign_id: str, outcomes: dict):
+    """Write probe outcomes to the checkpoint file (atomically)"""
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'campaign_id': campaign_id,
+                'updated_at': datetime.now(timezone.utc).isoformat(),
+                'outcomes': outcomes,
+            }, f)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"⚠️  Could not save checkpoint {path}: {e}")
+
+
+def get_all_phones(session: requests.Session = None):
     """Get all phone numbers from the database"""
     try:
-        response = requests.get(f"{API_BASE_URL}/api/phone", timeout=10)
+        response = (session or requests).get(f"{API_BASE_URL}/api/phone", timeout=10)
         if response.ok:
             return response.json().get('phones', [])
         return []
@@ -24,53 +96,127 @@ def get_all_phones():
         return []
 
 
-def get_message_logs():
-    """Get all message logs"""
+def get_successful_phones(session: requests.Session = None):
+    """
+    Get every phone number that has received at least one successful send
+
+    Returns:
+        Set of phone numbers, or None if the lookup failed
+    """
     try:
-        response = requests.get(f"{API_BASE_URL}/api/logs", timeout=10)
+        response = (session or requests).get(f"{API_BASE_URL}/api/logs/successful-phones", timeout=30)
         if response.ok:
-            return response.json().get('logs', [])
-        return []
+            return set(response.json().get('phones', []))
+        print(f"❌ Error fetching successful phones: {response.status_code}")
+        return None
     except Exception as e:
-        print(f"❌ Error fetching logs: {e}")
-        return []
+        print(f"❌ Error fetching successful phones: {e}")
+        return None
 
 
-def test_phone_with_capital_one(phone, platform, campaign_id, marketing_channel):
-    """Test a phone number with Capital One API"""
+def get_latest_successful_log(session: requests.Session = None):
+    """Get the most recent successful message log, or None"""
     try:
-        response = requests.post(
-            'https://api.capitalone.com/protected/24565/retail/digital-offers/text-pass',
-            headers={
-                'accept': 'application/json; v=1',
-                'accept-language': 'en-US,en;q=0.9',
-                'content-type': 'application/json',
-            },
-            json={
-                'campaignId': campaign_id,
-                'marketingChannel': marketing_channel,
-                'platform': platform,
-                'phoneNumber': phone,
-            },
+        response = (session or requests).get(
+            f"{API_BASE_URL}/api/logs",
+            params={'status': 'success', 'limit': 1},
             timeout=10
         )
+        if response.ok:
+            logs = response.json().get('logs', [])
+            return logs[0] if logs else None
+        return None
+    except Exception as e:
+        print(f"❌ Error fetching logs: {e}")
+        return None
+
+
+def is_connect_error(error: Exception) -> bool:
+    """True if a request failed before reaching the server, so sending it again cannot text twice"""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    # Failed connection attempts come wrapped in MaxRetryError; a connection dropped
+    # mid-request (or a read timeout) may already have delivered the text
+    return (isinstance(error, requests.exceptions.ConnectionError)
+            and bool(error.args) and isinstance(error.args[0], MaxRetryError))
+
+
+def test_phone_with_capital_one(phone, platform, campaign_id, marketing_channel, max_retries: int = 3,
+                                session: requests.Session = None, limiter: AdaptiveRateLimiter = None):
+    """
+    Test a phone number with Capital One API
+
+    When a shared limiter is given, every attempt takes a token from it.
+    Throttling responses (429/5xx) and slow responses slow it down for all
+    probes, and throttled probes are retried with backoff.
+
+    Each probe can text the phone, so only attempts that certainly did not
+    reach Capital One are retried: throttled responses and failed
+    connections. Read timeouts and dropped connections are reported as
+    errors instead.
+    """
+    http = session or requests
+    error = 'Network error'
+
+    for attempt in range(1, max_retries + 1):
+        if limiter:
+            limiter.acquire()
+
+        try:
+            started = time.monotonic()
+            response = http.post(
+                CAPITAL_ONE_API,
+                headers={
+                    'accept': 'application/json; v=1',
+                    'accept-language': 'en-US,en;q=0.9',
+                    'content-type': 'application/json',
+                },
+                json={
+                    'campaignId': campaign_id,
+                    'marketingChannel': marketing_channel,
+                    'platform': platform,
+                    'phoneNumber': phone,
+                },
+                timeout=10
+            )
+            latency = time.monotonic() - started
+
+            if response.status_code in THROTTLE_STATUSES:
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                if limiter:
+                    limiter.on_throttle(retry_after)
+                error = f'Throttled (HTTP {response.status_code})'
+                if attempt < max_retries:
+                    time.sleep(retry_after if retry_after is not None else 2 ** attempt)
+                continue
+
+            if limiter:
+                if latency > SLOW_PROBE_SECONDS:
+                    limiter.on_throttle()
+                else:
+                    limiter.on_success()
 
-        data = response.json()
+            if response.ok:
+                return {'success': True, 'error': None}
 
-        if response.ok:
-            return {'success': True, 'error': None}
+            data = response.json()
+            error_text = data.get('developerText', '') + data.get('userText', '')
+            return {'success': False, 'error': error_text}
 
-        error_text = data.get('developerText', '') + data.get('userText', '')
-        return {'success': False, 'error': error_text}
+        except Exception as e:
+            error = str(e)
+            if not is_connect_error(e):
+                break
+            if attempt < max_retries:
+                time.sleep(2 ** attempt)
 
-    except Exception as e:
-        return {'success': False, 'error': str(e)}
+    return {'success': False, 'error': error}
 
 
-def delete_phone(phone):
+def delete_phone(phone, session: requests.Session = None):
     """Delete a phone number"""
     try:
-        response = requests.delete(
+        response = (session or requests).delete(
             f"{API_BASE_URL}/api/phone",
             params={'phone': phone},
             timeout=10
@@ -81,29 +227,41 @@ def delete_phone(phone):
         return False
 
 
-def cleanup_phones():
-    """Main cleanup logic"""
+def cleanup_phones(concurrency: int = DEFAULT_CONCURRENCY, rate: float = DEFAULT_RATE,
+                   checkpoint_file: str = CHECKPOINT_FILE):
+    """
+    Main cleanup logic
+
+    Probes run `concurrency` at a time through one adaptive rate limiter
+    starting at `rate` probes per second. Each outcome is checkpointed, so
+    a rerun after an interruption only probes the phones still unchecked
+    (or whose probe errored), without spending more sends on the rest.
+    """
+    concurrency = max(1, concurrency)
+    session = create_session(concurrency)
+
     print(f"\n🧹 Phone Number Cleanup")
     print(f"{'='*70}")
-    print(f"API: {API_BASE_URL}\n")
+    print(f"API: {API_BASE_URL}")
+    print(f"Concurrency: {concurrency}, starting rate: {rate:.2f}/s\n")
 
     # Get all phones and logs
     print("📱 Fetching phone numbers...")
-    phones = get_all_phones()
+    phones = get_all_phones(session)
 
-    print("📋 Fetching message logs...")
-    logs = get_message_logs()
+    print("📋 Fetching phones with successful sends...")
+    successful_phones = get_successful_phones(session)
 
     if not phones:
         print("❌ No phones found\n")
         return
 
-    # Find phones that have never successfully received a message
-    successful_phones = set()
-    for log in logs:
-        if log['status'] == 'success':
-            successful_phones.add(log['phone_number'])
+    # Without the full success set we could delete healthy phones, so stop
+    if successful_phones is None:
+        print("❌ Could not determine which phones have received messages - aborting\n")
+        return
 
+    # Find phones that have never successfully received a message
     phones_to_check = [p for p in phones if p['phone'] not in successful_phones]
 
     print(f"\n📊 Status:")
@@ -116,40 +274,54 @@ def cleanup_phones():
         return
 
     # Find the most recent successful campaign to test with
-    successful_logs = [l for l in logs if l['status'] == 'success']
-    if not successful_logs:
+    recent_campaign = get_latest_successful_log(session)
+    if not recent_campaign:
         print("❌ No successful campaigns found - can't validate phones\n")
         return
 
-    recent_campaign = successful_logs[0]
     campaign_id = recent_campaign['campaign_id']
     marketing_channel = recent_campaign['marketing_channel']
 
     print(f"🧪 Testing with campaign: {campaign_id}\n")
     print(f"{'='*70}\n")
 
+    # Resume from an interrupted run: phones already found valid or invalid are not probed again
+    outcomes = load_checkpoint(checkpoint_file, campaign_id) if checkpoint_file else {}
+    resumed = {phone: outcome for phone, outcome in outcomes.items() if outcome in ('valid', 'invalid')}
+    to_probe = [p for p in phones_to_check if p['phone'] not in resumed]
+    if resumed:
+        print(f"♻️  Resuming: {len(resumed)} phone(s) already checked, {len(to_probe)} left\n")
+
     # Test each phone
-    validated = 0
+    validated = sum(1 for p in phones_to_check if resumed.get(p['phone']) == 'valid')
     invalid = 0
     deleted = 0
     errors = 0
 
-    for i, phone_record in enumerate(phones_to_check, 1):
+    limiter = AdaptiveRateLimiter(rate, capacity=concurrency)
+    pool = ThreadPoolExecutor(max_workers=concurrency)
+    futures = {
+        pool.submit(
+            test_phone_with_capital_one,
+            phone_record['phone'],
+            phone_record['platform'],
+            campaign_id,
+            marketing_channel,
+            session=session,
+            limiter=limiter
+        ): phone_record
+        for phone_record in to_probe
+    }
+
+    def handle(phone_record, result):
+        """Report one probe's result, deleting the phone if Capital One rejected it"""
+        nonlocal validated, invalid, deleted, errors
         phone = phone_record['phone']
-        platform = phone_record['platform']
-
-        print(f"[{i}/{len(phones_to_check)}] Testing {phone} ({platform})...")
-
-        # Test with Capital One
-        result = test_phone_with_capital_one(phone, platform, campaign_id, marketing_channel)
-
-        # Rate limit - wait between requests
-        if i < len(phones_to_check):
-            time.sleep(1.5)
 
         if result['success']:
             print(f"   ✅ Valid - phone accepted by Capital One")
             validated += 1
+            outcomes[phone] = 'valid'
         else:
             error_lower = (result['error'] or '').lower()
 
@@ -158,24 +330,65 @@ def cleanup_phones():
                 print(f"   ❌ Invalid phone number: {result['error']}")
                 print(f"   🗑️  Deleting from database...")
 
-                if delete_phone(phone):
+                if delete_phone(phone, session):
                     print(f"   ✅ Deleted successfully")
                     deleted += 1
+                    outcomes[phone] = 'invalid'
                 else:
                     print(f"   ❌ Failed to delete")
+                    outcomes[phone] = 'error'
 
                 invalid += 1
             elif 'campaign' in error_lower or 'expired' in error_lower:
                 print(f"   ⚠️  Campaign issue (can't validate): {result['error']}")
                 print(f"   ℹ️  Keeping phone number")
                 errors += 1
+                outcomes[phone] = 'error'
             else:
                 print(f"   ⚠️  Unknown error: {result['error']}")
                 print(f"   ℹ️  Keeping phone number (benefit of doubt)")
                 errors += 1
+                outcomes[phone] = 'error'
 
         print()
 
+    handled = set()
+    try:
+        # Results are handled (and phones deleted) from this thread as probes complete
+        for i, future in enumerate(as_completed(futures), 1):
+            phone_record = futures[future]
+            print(f"[{i}/{len(to_probe)}] Tested {phone_record['phone']} ({phone_record['platform']})")
+
+            handle(phone_record, future.result())
+            handled.add(future)
+
+            if checkpoint_file and i % CHECKPOINT_EVERY == 0:
+                save_checkpoint(checkpoint_file, campaign_id, outcomes)
+
+    except KeyboardInterrupt:
+        print("\n🛑 Interrupted - saving progress, rerun to resume\n")
+        pool.shutdown(wait=True, cancel_futures=True)
+
+        # Probes that finished meanwhile already texted their phones; keep their
+        # outcomes so the rerun does not probe them again
+        for future, phone_record in futures.items():
+            if future not in handled and future.done() and not future.cancelled():
+                print(f"Tested {phone_record['phone']} ({phone_record['platform']})")
+                handle(phone_record, future.result())
+
+        if checkpoint_file:
+            save_checkpoint(checkpoint_file, campaign_id, outcomes)
+        return
+
+    pool.shutdown()
+
+    # Keep the checkpoint while some probes errored so a rerun retries only those
+    if checkpoint_file:
+        if errors:
+            save_checkpoint(checkpoint_file, campaign_id, outcomes)
+        elif os.path.exists(checkpoint_file):
+            os.remove(checkpoint_file)
+
     # Summary
     print(f"{'='*70}")
     print(f"Cleanup Summary")
@@ -185,6 +398,8 @@ def cleanup_phones():
     print(f"⚠️  Errors/Unable to validate: {errors}")
     print(f"🗑️  Deleted: {deleted}")
     print(f"📊 Total checked: {len(phones_to_check)}")
+    if resumed:
+        print(f"♻️  From checkpoint: {len(resumed)}")
     print()
 
 
@@ -200,13 +415,41 @@ def main():
         default='http://localhost:3001',
         help='Base URL for the API (default: http://localhost:3001)'
     )
+    parser.add_argument(
+        '--concurrency',
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f'Probes in flight at once (default: {DEFAULT_CONCURRENCY})'
+    )
+    parser.add_argument(
+        '--rate',
+        type=float,
+        default=DEFAULT_RATE,
+        help=f'Starting probes per second; adapts to 429s and latency (default: {DEFAULT_RATE:.2f})'
+    )
+    parser.add_argument(
+        '--checkpoint-file',
+        default=CHECKPOINT_FILE,
+        help=f'Where probe progress is saved for resuming (default: {CHECKPOINT_FILE})'
+    )
+    parser.add_argument(
+        '--no-checkpoint',
+        action='store_true',
+        help='Probe every phone and do not save progress'
+    )
+    add_profile_argument(parser)
 
     args = parser.parse_args()
 
     # Set API URL from argument
     os.environ['API_BASE_URL'] = args.api_url
 
-    cleanup_phones()
+    with profile(args.profile, 'cleanup_phones'):
+        cleanup_phones(
+            concurrency=args.concurrency,
+            rate=args.rate,
+            checkpoint_file=None if args.no_checkpoint else args.checkpoint_file
+        )
 
 
 if __name__ == '__main__':
@@ -3,19 +3,28 @@
 Coffree Finder - Automatically finds and submits Capital One coffee links from Reddit
 """
 
-import re
+import json
 import requests
 import time
-from datetime import datetime
-from typing import List, Set, Dict, Optional
+from datetime import datetime, timezone
+from typing import Callable, List, Set, Dict, NamedTuple, Optional
 import os
 from urllib.parse import urlparse, parse_qs
-import html
-import praw
 import sys
 import logging
+import threading
+import signal
+import sqlite3
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 
+from coffree_links import CoffreeLink, extract_links
+from profiling import add_profile_argument, profile
+from rate_limiter import TokenBucket
+from reddit_token_cache import RedditTokenCache, read_only_authorizer
+from run_metrics import RunMetrics, endpoint_name
+from submission_cache import SubmissionCache
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -34,21 +43,140 @@ SUBREDDITS = [
     'freebies',         # Active - 2 posts in past year
 ]
 
+# Subreddits are searched together as multireddits (r/a+b+c). Each one is kept
+# under these limits so its search URL stays well within what Reddit accepts.
+MULTIREDDIT_MAX_SUBREDDITS = 50
+MULTIREDDIT_MAX_NAME_LENGTH = 1000
+
 # Reddit search URL template (no authentication needed for public search)
 REDDIT_SEARCH_URL = "https://www.reddit.com/r/{}/search.json"
 
 # Your local API endpoint
 API_BASE_URL = os.getenv('API_BASE_URL', 'http://localhost:3001')
 
-# Pattern to match coffree links
-COFFREE_PATTERN = r'https?://coffree\.capitalone\.com/sms/\?[^"\s<>]+'
+# Reddit allows 100 OAuth requests per minute per client, averaged over a
+# 10 minute window. All scan workers share one token bucket so the combined
+# rate stays under that quota while short runs can still burst. Override with
+# REDDIT_REQUESTS_PER_MINUTE for other quotas (e.g. a local benchmark server).
+REDDIT_REQUESTS_PER_MINUTE = int(os.getenv('REDDIT_REQUESTS_PER_MINUTE', 100))
+REDDIT_BURST = 60
+
+# Default number of concurrent workers for subreddit searches and comment loads
+DEFAULT_WORKERS = 8
+
+# Incremental mode keeps a per-subreddit high-water mark (newest post seen) here
+STATE_FILE = os.getenv('COFFREE_STATE_FILE', '.coffree_finder_state.json')
+
+# Incremental searches re-check this much history before the cursor so links
+# added to the comments of recent posts are still picked up
+CURSOR_OVERLAP_SECONDS = 3600
+
+# Comment-tree scan results are cached here so unchanged posts are not re-expanded
+CACHE_FILE = os.getenv('COFFREE_CACHE_FILE', '.coffree_finder_cache.sqlite3')
+
+# The app-only Reddit OAuth token is reused from here until it expires (~24h),
+# saving the token request on every short run
+TOKEN_FILE = os.getenv('COFFREE_TOKEN_FILE', '.coffree_reddit_token.json')
+
+# Campaigns per batch request to /api/campaigns (the API accepts up to 500)
+CAMPAIGN_BATCH_SIZE = 500
+
+# Cached campaign validation results (campaigns.validation_result) are trusted
+# for this long; matches the API's setting of the same name
+CAMPAIGN_VALIDATION_TTL_SECONDS = int(os.getenv('CAMPAIGN_VALIDATION_TTL_SECONDS', 6 * 3600))
+
+# /api/send-coffee is driven in chunks of this many phones, each retried this
+# many times on timeout; phones that already received a campaign are skipped
+# server-side, so a retried chunk only sends what is still missing
+SEND_CHUNK_SIZE = 50
+SEND_CHUNK_RETRIES = 3
+SEND_CHUNK_TIMEOUT = 30
+
+# Streaming mode records/submits this many newly found campaigns at once
+STREAM_WORKERS = 2
+
+# Watch mode reconnects after stream errors with exponential backoff (seconds)
+WATCH_BACKOFF_INITIAL = 5
+WATCH_BACKOFF_MAX = 300
+
+# Watch mode waits between polls that return nothing new, doubling the wait
+# while the streams stay quiet (seconds)
+WATCH_IDLE_INITIAL = 1
+WATCH_IDLE_MAX = 16
+
+# Watch mode writes its stream checkpoint to the state file this often (seconds)
+WATCH_CHECKPOINT_INTERVAL = 60
+
+
+class CampaignSighting(NamedTuple):
+    """Where a campaign's link was seen on Reddit"""
+    link: CoffreeLink
+    subreddit: str
+    source_url: str  # Post URL, or comment permalink for links found in comments
+    created: datetime
+
+
+def plan_multireddits(subreddits: List[str], max_subreddits: int = MULTIREDDIT_MAX_SUBREDDITS,
+                      max_length: int = MULTIREDDIT_MAX_NAME_LENGTH) -> List[List[str]]:
+    """
+    Group subreddits into as few multireddit searches as the limits allow
+
+    Args:
+        subreddits: Subreddit names, in the order they should be searched
+        max_subreddits: Most subreddits in one multireddit
+        max_length: Longest 'a+b+c' name allowed in one multireddit
+
+    Returns:
+        List of subreddit groups; each is searched as r/<'+'.join(group)>
+    """
+    groups: List[List[str]] = []
+    length = 0
+    for subreddit in dict.fromkeys(subreddits):  # Drop duplicates, keep order
+        added = len(subreddit) + (1 if groups and groups[-1] else 0)
+        if not groups or len(groups[-1]) >= max_subreddits or length + added > max_length:
+            groups.append([])
+            added = len(subreddit)
+            length = 0
+        groups[-1].append(subreddit)
+        length += added
+    return groups
+
+
+class RedditAuthError(Exception):
+    """Reddit rejected the client credentials"""
+
+
+def is_auth_error(error: Exception) -> bool:
+    """Whether a PRAW error means the credentials were rejected (not a transient failure)"""
+    from prawcore.exceptions import OAuthException, ResponseException
+
+    if isinstance(error, OAuthException):
+        return True
+    return isinstance(error, ResponseException) and error.response.status_code == 401
 
 
 class CoffreeFinder:
-    def __init__(self):
+    def __init__(self, workers: int = DEFAULT_WORKERS, incremental: bool = False, state_file: str = STATE_FILE,
+                 cache_file: Optional[str] = CACHE_FILE, send_concurrency: Optional[int] = None,
+                 send_priority: Optional[str] = None, token_file: Optional[str] = TOKEN_FILE):
         logger.info("Initializing CoffreeFinder...")
 
-        self.session = requests.Session()
+        self.workers = max(1, workers)
+        self.incremental = incremental
+        self.send_concurrency = send_concurrency
+        self.send_priority = send_priority
+        self.state_file = state_file
+        self.cursors: Dict[str, Dict] = self.load_state() if incremental else {}
+        self.new_cursors: Dict[str, Dict] = {}
+        self.watch_checkpoint: Dict[str, Dict] = {}
+        self.validations: Dict[str, tuple[str, float]] = {}  # campaign_id -> (result, validated_at)
+        self._validations_lock = threading.Lock()
+        self.cache = SubmissionCache(cache_file) if cache_file else None
+        self.rate_limiter = TokenBucket(REDDIT_REQUESTS_PER_MINUTE / 60, REDDIT_BURST)
+        self.comment_pool = ThreadPoolExecutor(max_workers=self.workers)
+        self.metrics = RunMetrics()
+
+        self.session = self.metrics.instrument(requests.Session(), 'api')
         self.session.headers.update({
             'User-Agent': 'CoffreeFinder/1.0 (Coffee Link Aggregator)'
         })
@@ -71,147 +199,411 @@ class CoffreeFinder:
             logger.error("Please set the REDDIT_CLIENT_SECRET environment variable or secret in GitHub Actions")
             sys.exit(1)
 
-        # Initialize Reddit instance with read-only access
-        logger.info("Initializing Reddit API connection...")
+        # The Reddit client is created on first use, and the credentials are
+        # checked by the first real request rather than a test call
+        self._client_id = client_id
+        self._client_secret = client_secret
+        self._reddit = None
+        self._reddit_lock = threading.Lock()
+        self.token_cache = RedditTokenCache(token_file, client_id) if token_file else None
+
+    @property
+    def reddit(self):
+        """Read-only Reddit client, created (and praw imported) on first use"""
+        with self._reddit_lock:
+            if self._reddit is None:
+                import praw
+
+                logger.info("Initializing Reddit API connection...")
+                self._reddit = praw.Reddit(
+                    client_id=self._client_id,
+                    client_secret=self._client_secret,
+                    user_agent='CoffreeFinder/1.0 (Coffee Link Aggregator)',
+                    requestor_kwargs={'session': self.metrics.instrument(requests.Session(), 'reddit')}
+                )
+                if self.token_cache and self.token_cache.restore(self._reddit):
+                    logger.info(f"Reusing cached Reddit access token from {self.token_cache.path}")
+                else:
+                    # Fetch the token once here; otherwise every worker's first
+                    # request races to fetch its own
+                    authorizer = read_only_authorizer(self._reddit)
+                    if authorizer is not None and not authorizer.is_valid():
+                        authorizer.refresh()
+            return self._reddit
+
+    def save_reddit_token(self):
+        """Save the current Reddit access token for the next run"""
+        if self.token_cache and self._reddit is not None:
+            try:
+                if self.token_cache.save(self._reddit):
+                    logger.debug(f"Saved Reddit access token to {self.token_cache.path}")
+            except OSError as e:
+                logger.warning(f"Could not save Reddit access token: {e}")
+
+    def close_cache(self):
+        """Prune the submission cache and close its database"""
+        if self.cache:
+            try:
+                self.cache.close()
+            except sqlite3.Error as e:
+                logger.warning(f"Could not close submission cache: {e}")
+            self.cache = None
+
+    def exit_auth_failed(self, error: Exception):
+        """Report rejected Reddit credentials and exit"""
+        logger.error(f"❌ Failed to connect to Reddit API: {error}")
+        logger.error("This usually means your credentials are invalid or expired")
+        print(f"❌ Failed to connect to Reddit API: {error}")
+        sys.exit(1)
+
+    def load_state(self) -> Dict[str, Dict]:
+        """
+        Load per-subreddit cursors from the state file
+
+        Returns:
+            Dict mapping subreddit name to {'created_utc', 'fullname'} of the newest post seen
+        """
         try:
-            self.reddit = praw.Reddit(
-                client_id=client_id,
-                client_secret=client_secret,
-                user_agent='CoffreeFinder/1.0 (Coffee Link Aggregator)'
-            )
-            # Test the connection by making a simple API call
-            self.reddit.user.me()
-            logger.info("✅ Reddit API connection successful (read-only mode)")
+            with open(self.state_file) as f:
+                cursors = json.load(f).get('subreddits', {})
+            logger.info(f"Loaded incremental state for {len(cursors)} subreddit(s) from {self.state_file}")
+            return cursors
+        except FileNotFoundError:
+            logger.info(f"No incremental state at {self.state_file} - doing a full scan")
+            return {}
         except Exception as e:
-            logger.error(f"❌ Failed to connect to Reddit API: {e}")
-            logger.error("This usually means your credentials are invalid or expired")
-            sys.exit(1)
+            logger.warning(f"Could not read incremental state from {self.state_file}: {e} - doing a full scan")
+            return {}
 
-    def search_reddit(self, subreddit: str, timeframe: str = 'month') -> List[Dict]:
+    def load_watch_checkpoint(self) -> Dict[str, Dict]:
         """
-        Search a subreddit for coffree links in posts and comments
-
-        Args:
-            subreddit: Name of the subreddit
-            timeframe: Time period to search (hour, day, week, month, year, all)
+        Load the watch mode stream checkpoint from the state file
 
         Returns:
-            List of post data dictionaries
+            Dict mapping stream name ('submissions'/'comments') to {'created_utc', 'fullname'}
+            of the newest item handled
         """
         try:
-            logger.info(f"🔍 Searching r/{subreddit}...")
-            print(f"🔍 Searching r/{subreddit}...")
-
-            # Get the subreddit
-            logger.debug(f"Getting subreddit object for r/{subreddit}")
-            sub = self.reddit.subreddit(subreddit)
-
-            # Search for coffree links in posts
-            logger.debug(f"Searching for 'coffree.capitalone.com' in r/{subreddit} (timeframe: {timeframe})")
-            results = sub.search(
-                query='coffree.capitalone.com',
-                time_filter=timeframe,
-                limit=100,
-                sort='new'
-            )
+            with open(self.state_file) as f:
+                return json.load(f).get('watch', {})
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"Could not read watch checkpoint from {self.state_file}: {e}")
+            return {}
 
-            # Convert PRAW submission objects to dictionaries
-            posts = []
-            posts_from_search = set()
-            logger.debug("Processing search results...")
-            for submission in results:
-                posts.append({
-                    'title': submission.title,
-                    'selftext': submission.selftext,
-                    'url': submission.url,
-                    'permalink': submission.permalink,
-                    'created_utc': submission.created_utc,
-                    'id': submission.id,
-                    'author': str(submission.author) if submission.author else '[deleted]',
-                })
-                posts_from_search.add(submission.id)
-
-            logger.debug(f"Found {len(posts)} posts from direct search")
-
-            # Also search broader terms to catch posts where link is only in comments
-            logger.debug("Searching for broader terms to catch posts with links in comments")
-            broader_results = sub.search(
-                query='capital one coffee OR capitalone coffee OR coffree',
-                time_filter=timeframe,
-                limit=100,
-                sort='new'
-            )
+    def save_state(self):
+        """Merge this run's cursors and watch checkpoint into the state file (written atomically)"""
+        self.cursors.update(self.new_cursors)
+        state = {}
+        try:
+            with open(self.state_file) as f:
+                state = json.load(f)
+        except Exception:
+            pass  # Missing or unreadable state is replaced below
 
-            # Check comments on these posts for coffree links
-            for submission in broader_results:
-                # Skip if we already got this from the direct search
-                if submission.id in posts_from_search:
-                    continue
+        state['updated_at'] = datetime.now(timezone.utc).isoformat()
+        state['subreddits'] = {**state.get('subreddits', {}), **self.cursors}
+        if self.watch_checkpoint:
+            state['watch'] = self.watch_checkpoint
 
-                try:
-                    # Load comments (limit to avoid rate limiting)
-                    submission.comments.replace_more(limit=0)
-
-                    # Check if any comment contains coffree link
-                    has_coffree_link = False
-                    for comment in submission.comments.list()[:50]:  # Check first 50 comments
-                        if 'coffree.capitalone.com' in comment.body:
-                            has_coffree_link = True
-                            break
+        tmp_file = f"{self.state_file}.tmp"
+        try:
+            with open(tmp_file, 'w') as f:
+                json.dump(state, f, indent=2)
+            os.replace(tmp_file, self.state_file)
+            logger.info(f"Saved incremental state for {len(self.cursors)} subreddit(s) to {self.state_file}")
+        except Exception as e:
+            logger.warning(f"Could not save incremental state to {self.state_file}: {e}")
+
+    def _submission_to_post(self, submission) -> Dict:
+        """Convert a PRAW submission object to a post dictionary"""
+        return {
+            'title': submission.title,
+            'selftext': submission.selftext,
+            'url': submission.url,
+            'permalink': submission.permalink,
+            'created_utc': submission.created_utc,
+            'id': submission.id,
+            'author': str(submission.author) if submission.author else '[deleted]',
+        }
+
+    def _search_submissions(self, sub, query: str, timeframe: str, since: Optional[float] = None,
+                            limit: int = 100) -> List:
+        """
+        Run one subreddit search and materialize the results
 
-                    if has_coffree_link:
-                        posts.append({
-                            'title': submission.title,
-                            'selftext': submission.selftext,
-                            'url': submission.url,
-                            'permalink': submission.permalink,
+        Without `since` this fetches the newest `limit` results (one API request per 100).
+        With `since` (incremental mode) it pages through newest-first results and
+        stops at the first submission created at or before `since`, so a
+        steady-state run costs one request per query.
+        """
+        self.rate_limiter.acquire()
+        results = []
+        listing = sub.search(
+            query=query,
+            time_filter=timeframe,
+            limit=None if since is not None else limit,
+            sort='new'
+        )
+        for submission in listing:
+            if since is not None and submission.created_utc <= since:
+                break  # Everything after this was seen on a previous run
+            results.append(submission)
+            if len(results) % 100 == 0:
+                self.rate_limiter.acquire()  # The next item comes from a new page
+        return results
+
+    def _scan_comments(self, submission) -> List[tuple[CoffreeLink, str]]:
+        """
+        Load a submission's comment tree (unless cached) and extract coffree links from it
+
+        Returns:
+            List of (link, comment permalink) pairs, one per campaign/channel
+        """
+        if self.cache:
+            cached = self.cache.get(submission.id, submission.num_comments)
+            if cached is not None and 'links' in cached:
+                logger.debug(f"Using cached comment scan for post {submission.id}")
+                return [
+                    (CoffreeLink(**{k: v for k, v in item.items() if k != 'permalink'}), item['permalink'])
+                    for item in cached['links']
+                ]
+
+        # Loading comments is one API request (replace_more(limit=0) makes no extra calls)
+        self.rate_limiter.acquire()
+        with self.metrics.phase('comments'):
+            submission.comments.replace_more(limit=0)
+
+        comment_links = []
+        seen = set()
+        for comment in submission.comments.list()[:50]:  # Check first 50 comments
+            if 'coffree.capitalone.com' not in comment.body:
+                continue
+            for link in extract_links(comment.body):
+                if link.key not in seen:
+                    seen.add(link.key)
+                    comment_links.append((link, f"https://reddit.com{comment.permalink}"))
+
+        if self.cache:
+            self.cache.put(submission.id, submission.num_comments, {
+                'links': [dict(link._asdict(), permalink=permalink) for link, permalink in comment_links]
+            })
+        return comment_links
+
+    def search_subreddits(self, subreddits: List[str], timeframe: str = 'month',
+                          on_post: Optional[Callable[[str, Dict], None]] = None) -> Dict[str, List[Dict]]:
+        """
+        Search several subreddits at once for coffree links in posts and comments
+
+        Both searches go to the multireddit r/a+b+c, so their cost does not
+        grow with the number of subreddits; results are split back out by
+        each submission's subreddit. The broader search and the comment tree
+        loads run on the shared comment pool, paced by the finder's Reddit
+        rate limiter.
+
+        Args:
+            subreddits: Subreddit names, as planned by plan_multireddits
+            timeframe: Time period to search (hour, day, week, month, year, all)
+            on_post: Called with (subreddit, post) as soon as each post is found, before the search finishes
+
+        Returns:
+            Dict mapping each subreddit to its list of post data dictionaries
+        """
+        name = '+'.join(subreddits)
+        posts_by_subreddit: Dict[str, List[Dict]] = {subreddit: [] for subreddit in subreddits}
+        # Reddit reports display names in their canonical case
+        canonical = {subreddit.lower(): subreddit for subreddit in subreddits}
+
+        with self.metrics.phase(f'search:r/{name}'):
+            try:
+                logger.info(f"🔍 Searching r/{name}...")
+                print(f"🔍 Searching r/{name}...")
+
+                # Get the (multi)subreddit
+                logger.debug(f"Getting subreddit object for r/{name}")
+                sub = self.reddit.subreddit(name)
+
+                # In incremental mode only fetch posts newer than each stored cursor.
+                # The shared search has to reach back to the oldest of them.
+                since_by_subreddit = {}
+                for subreddit in subreddits:
+                    cursor = self.cursors.get(subreddit)
+                    since_by_subreddit[subreddit] = (
+                        cursor['created_utc'] - CURSOR_OVERLAP_SECONDS if cursor else None
+                    )
+                since_values = list(since_by_subreddit.values())
+                since = None if None in since_values else min(since_values)
+                if since is not None:
+                    logger.debug(f"Incremental search of r/{name} since {datetime.fromtimestamp(since)}")
+
+                def subreddit_of(submission) -> Optional[str]:
+                    """Which searched subreddit a result belongs to, or None if already seen"""
+                    subreddit = canonical.get(submission.subreddit.display_name.lower())
+                    if subreddit is None:
+                        return None
+                    subreddit_since = since_by_subreddit[subreddit]
+                    if subreddit_since is not None and submission.created_utc <= subreddit_since:
+                        return None  # Older than this subreddit's own cursor
+                    return subreddit
+
+                # Full scans keep the same result depth per subreddit as separate searches had
+                limit = 100 * len(subreddits)
+
+                # Also search broader terms to catch posts where link is only in comments.
+                # Start it now so it runs alongside the direct search.
+                logger.debug("Searching for broader terms to catch posts with links in comments")
+                broader_future = self.comment_pool.submit(
+                    self._search_submissions,
+                    sub,
+                    'capital one coffee OR capitalone coffee OR coffree',
+                    timeframe,
+                    since,
+                    limit
+                )
+
+                # Search for coffree links in posts
+                logger.debug(f"Searching for 'coffree.capitalone.com' in r/{name} (timeframe: {timeframe})")
+                results = self._search_submissions(sub, 'coffree.capitalone.com', timeframe, since, limit)
+
+                # Convert PRAW submission objects to dictionaries
+                found = 0
+                posts_from_search = set()
+                logger.debug("Processing search results...")
+                for submission in results:
+                    posts_from_search.add(submission.id)
+                    subreddit = subreddit_of(submission)
+                    if subreddit is None:
+                        continue
+                    post = self._submission_to_post(submission)
+                    posts_by_subreddit[subreddit].append(post)
+                    found += 1
+                    if on_post:
+                        on_post(subreddit, post)
+
+                logger.debug(f"Found {found} posts from direct search")
+
+                broader_results = broader_future.result()
+
+                # Extract coffree links from the comments of the broader results, in parallel
+                comment_checks = [
+                    (subreddit, submission, self.comment_pool.submit(self._scan_comments, submission))
+                    for submission, subreddit in ((candidate, subreddit_of(candidate)) for candidate in broader_results)
+                    # Skip if we already got this from the direct search
+                    if subreddit is not None and submission.id not in posts_from_search
+                ]
+
+                # Oldest post per subreddit whose comments could not be scanned
+                failed_before: Dict[str, float] = {}
+
+                for subreddit, submission, future in comment_checks:
+                    try:
+                        comment_links = future.result()
+                        if comment_links:
+                            post = self._submission_to_post(submission)
+                            post['comment_links'] = comment_links
+                            posts_by_subreddit[subreddit].append(post)
+                            found += 1
+                            if on_post:
+                                on_post(subreddit, post)
+                    except Exception as comment_error:
+                        logger.debug(f"Could not load comments for post {submission.id}: {comment_error}")
+                        # Skip posts where we can't load comments, but scan them again next run
+                        failed_before[subreddit] = min(
+                            failed_before.get(subreddit, submission.created_utc), submission.created_utc
+                        )
+                        continue
+
+                # Advance each subreddit's high-water mark to the newest post the search
+                # returned for it, stopping short of any post whose comments failed to load
+                for submission in results + broader_results:
+                    subreddit = canonical.get(submission.subreddit.display_name.lower())
+                    if subreddit is None:
+                        continue
+                    if subreddit in failed_before and submission.created_utc >= failed_before[subreddit]:
+                        continue
+                    cursor = self.new_cursors.get(subreddit) or self.cursors.get(subreddit)
+                    if not cursor or submission.created_utc > cursor['created_utc']:
+                        self.new_cursors[subreddit] = {
                             'created_utc': submission.created_utc,
-                            'id': submission.id,
-                            'author': str(submission.author) if submission.author else '[deleted]',
-                        })
-                except Exception as comment_error:
-                    logger.debug(f"Could not load comments for post {submission.id}: {comment_error}")
-                    # Skip posts where we can't load comments
-                    continue
+                            'fullname': submission.fullname,
+                        }
 
-            logger.info(f"   Found {len(posts)} posts with coffree links")
-            print(f"   Found {len(posts)} posts")
-            return posts
+                for subreddit, posts in posts_by_subreddit.items():
+                    logger.info(f"   r/{subreddit}: found {len(posts)} posts with coffree links")
+                print(f"   Found {found} posts")
+                return posts_by_subreddit
 
-        except Exception as e:
-            logger.error(f"   ❌ Error searching r/{subreddit}: {e}", exc_info=True)
-            print(f"   ❌ Error searching r/{subreddit}: {e}")
-            return []
+            except Exception as e:
+                if is_auth_error(e):
+                    raise RedditAuthError(str(e)) from e
+                logger.error(f"   ❌ Error searching r/{name}: {e}", exc_info=True)
+                print(f"   ❌ Error searching r/{name}: {e}")
+                return {subreddit: [] for subreddit in subreddits}
+
+    def search_reddit(self, subreddit: str, timeframe: str = 'month',
+                      on_post: Optional[Callable[[Dict], None]] = None) -> List[Dict]:
+        """
+        Search a single subreddit for coffree links in posts and comments
+
+        Args:
+            subreddit: Name of the subreddit
+            timeframe: Time period to search (hour, day, week, month, year, all)
+            on_post: Called with each post as soon as it is found, before the search finishes
+
+        Returns:
+            List of post data dictionaries
+        """
+        return self.search_subreddits(
+            [subreddit], timeframe, (lambda _, post: on_post(post)) if on_post else None
+        )[subreddit]
 
-    def extract_links_from_post(self, post: Dict) -> List[str]:
+    def extract_links_from_post(self, post: Dict) -> List[tuple[CoffreeLink, str]]:
         """
-        Extract coffree links from a Reddit post
+        Extract coffree links from a Reddit post and the comments scanned for it
 
         Args:
             post: Reddit post data dictionary
 
         Returns:
-            List of coffree links found (with HTML entities decoded)
+            List of (link, source URL) pairs, one per campaign/channel. The source is
+            the comment permalink for links only found in comments, else the post URL.
         """
-        links = []
+        post_url = f"https://reddit.com{post.get('permalink', '')}"
+        links = [
+            (link, post_url)
+            for link in extract_links(post.get('title', ''), post.get('selftext', ''), post.get('url', ''))
+        ]
 
-        # Search in title
-        title = post.get('title', '')
-        links.extend(re.findall(COFFREE_PATTERN, title))
+        seen = {link.key for link, _ in links}
+        for link, permalink in post.get('comment_links', []):
+            if link.key not in seen:
+                seen.add(link.key)
+                links.append((link, permalink))
 
-        # Search in selftext (body)
-        selftext = post.get('selftext', '')
-        links.extend(re.findall(COFFREE_PATTERN, selftext))
+        return links
+
+    def index_post(self, subreddit: str, post: Dict, index: Dict[str, List[CampaignSighting]]) -> List[tuple[CoffreeLink, str]]:
+        """
+        Extract a post's links and add them to the campaign provenance index
+
+        Args:
+            subreddit: Subreddit the post was found in
+            post: Reddit post data dictionary
+            index: campaign_id -> sightings, in the order they were seen (the first is used for recording)
 
-        # Search in URL (if it's a link post)
-        url = post.get('url', '')
-        if 'coffree.capitalone.com' in url:
-            links.append(url)
+        Returns:
+            The post's (link, source URL) pairs
+        """
+        links = self.extract_links_from_post(post)
+        created = datetime.fromtimestamp(post.get('created_utc', 0))
 
-        # Decode HTML entities (e.g., &amp; -> &)
-        decoded_links = [html.unescape(link) for link in links]
+        for link, source_url in links:
+            index.setdefault(link.campaign_id, []).append(
+                CampaignSighting(link, subreddit, source_url, created)
+            )
 
-        return list(set(decoded_links))  # Remove duplicates
+        return links
 
     def parse_campaign_id(self, link: str) -> Optional[str]:
         """
@@ -230,65 +622,167 @@ class CoffreeFinder:
         except Exception:
             return None
 
-    def check_if_submitted(self, link: str) -> bool:
+    def get_submitted_campaign_ids(self, campaign_ids) -> Set[str]:
         """
-        Check if a link has already been submitted to the API
+        Find which campaigns have already been submitted, with one bulk request
+
+        A campaign counts as submitted once its fan-out reached every
+        subscriber. One whose chunked send stopped partway is not returned, so
+        it is submitted again and the API resumes with the phones not yet sent.
 
         Args:
-            link: Coffree link to check
+            campaign_ids: Campaign IDs to check
 
         Returns:
-            True if already submitted, False otherwise
+            Set of the given campaign IDs that were already submitted
         """
-        campaign_id = self.parse_campaign_id(link)
-        if not campaign_id:
-            return False
+        campaign_ids = sorted({cid for cid in campaign_ids if cid})
+        if not campaign_ids:
+            return set()
 
         try:
-            # Check if this campaign ID exists in the database
-            response = self.session.get(
+            response = self.session.post(
                 f"{API_BASE_URL}/api/check-campaign",
-                params={'cid': campaign_id},
+                json={'cids': campaign_ids},
                 timeout=10
             )
 
             if response.ok:
-                result = response.json()
-                return result.get('exists', False)
+                return set(response.json().get('known', []))
 
-            return False
+            print(f"   ⚠️  Could not check submission status: HTTP {response.status_code}")
+            return set()
 
         except Exception as e:
             print(f"   ⚠️  Could not check submission status: {e}")
-            # If we can't check, assume it's not submitted to avoid missing it
+            # If we can't check, assume nothing is submitted to avoid missing links
+            return set()
+
+    def check_if_submitted(self, link: str) -> bool:
+        """
+        Check if a link has already been submitted to the API
+
+        Args:
+            link: Coffree link to check
+
+        Returns:
+            True if already submitted, False otherwise
+        """
+        campaign_id = self.parse_campaign_id(link)
+        if not campaign_id:
             return False
 
-    def submit_link(self, link: str) -> bool:
+        return campaign_id in self.get_submitted_campaign_ids([campaign_id])
+
+    def remember_validation(self, campaign_id: str, result: str, validated_at: Optional[str] = None):
+        """
+        Remember a campaign's validation result
+
+        Args:
+            campaign_id: Campaign ID
+            result: 'valid', 'expired' or 'invalid'
+            validated_at: ISO timestamp from the campaigns table (default: now)
+        """
+        timestamp = time.time()
+        if validated_at:
+            try:
+                timestamp = datetime.fromisoformat(validated_at.replace('Z', '+00:00')).timestamp()
+            except ValueError:
+                return  # Unparseable timestamps are treated as stale
+
+        with self._validations_lock:
+            self.validations[campaign_id] = (result, timestamp)
+
+    def cached_validation(self, campaign_id: str) -> Optional[str]:
+        """
+        Get a campaign's validation result if it is younger than CAMPAIGN_VALIDATION_TTL_SECONDS
+
+        Returns:
+            'valid', 'expired', 'invalid', or None if unknown or stale
+        """
+        with self._validations_lock:
+            cached = self.validations.get(campaign_id)
+        if cached and time.time() - cached[1] <= CAMPAIGN_VALIDATION_TTL_SECONDS:
+            return cached[0]
+        return None
+
+    def is_rejected(self, campaign_id: str) -> bool:
+        """True if the campaign is known to be expired or invalid, so submitting it can never succeed"""
+        return self.cached_validation(campaign_id) in ('expired', 'invalid')
+
+    def submit_link(self, link: str, concurrency: Optional[int] = None, priority: Optional[str] = None) -> bool:
         """
         Submit a coffree link to the API
 
+        Links whose campaign is cached as expired or invalid are skipped
+        without a request. Otherwise the fan-out to subscribers is driven in
+        chunks of SEND_CHUNK_SIZE phones, resuming after the API's
+        next_after_id, and a chunk that times out is retried rather than
+        failing the link. The API logs sends as they complete, so a retried
+        chunk skips the phones the timed-out attempt already reached.
+
         Args:
             link: Coffree link to submit
+            concurrency: Concurrent sends the API should use (default: the finder's send_concurrency)
+            priority: 'high', 'normal' or 'low' hint for the API's send concurrency (default: send_priority)
 
         Returns:
-            True if submission successful, False otherwise
+            True if every chunk was submitted successfully, False otherwise
         """
-        try:
-            response = self.session.post(
-                f"{API_BASE_URL}/api/send-coffee",
-                json={'link': link},
-                timeout=30
-            )
+        campaign_id = self.parse_campaign_id(link)
+        cached = self.cached_validation(campaign_id) if campaign_id else None
+        if cached in ('expired', 'invalid'):
+            print(f"   {'⏰ Expired' if cached == 'expired' else '❌ Invalid'}: skipped (cached validation result)")
+            return False
 
-            result = response.json()
+        payload = {'link': link, 'limit': SEND_CHUNK_SIZE}
+        concurrency = concurrency or self.send_concurrency
+        priority = priority or self.send_priority
+        if concurrency:
+            payload['concurrency'] = concurrency
+        if priority:
+            payload['priority'] = priority
+
+        stats = {'sent': 0, 'skipped': 0, 'failed': 0}
+        after_id = 0
+        processed = 0
+
+        while True:
+            payload['after_id'] = after_id
+            response = None
+            for attempt in range(1, SEND_CHUNK_RETRIES + 1):
+                try:
+                    response = self.session.post(
+                        f"{API_BASE_URL}/api/send-coffee",
+                        json=payload,
+                        timeout=SEND_CHUNK_TIMEOUT
+                    )
+                    break
+                except requests.exceptions.Timeout:
+                    print(f"   ⏳ Chunk after phone #{processed} timed out (attempt {attempt}/{SEND_CHUNK_RETRIES})")
+                    if attempt < SEND_CHUNK_RETRIES:
+                        self.metrics.count_retry(endpoint_name('api', 'POST', '/api/send-coffee'))
+                except Exception as e:
+                    print(f"   ❌ Submission failed: {e}")
+                    return False
+
+            if response is None:
+                print(f"   ❌ Submission failed: chunk after phone #{processed} timed out {SEND_CHUNK_RETRIES} times")
+                return False
 
-            if response.ok:
-                print(f"   ✅ Successfully submitted: {result.get('message', 'Success')}")
-                return True
-            else:
+            try:
+                result = response.json()
+            except ValueError:
+                print(f"   ❌ Error: HTTP {response.status_code} {response.text[:200]}")
+                return False
+
+            if not response.ok:
                 error = result.get('error', 'Unknown error')
                 error_type = result.get('type', '')
 
+                if campaign_id and error_type in ('expired', 'invalid'):
+                    self.remember_validation(campaign_id, error_type)
+
                 if error_type == 'duplicate':
                     print(f"   ℹ️  Duplicate: {error}")
                 elif error_type == 'expired':
@@ -300,14 +794,41 @@ class CoffreeFinder:
 
                 return False
 
-        except Exception as e:
-            print(f"   ❌ Submission failed: {e}")
-            return False
+            for key in stats:
+                stats[key] += result.get('stats', {}).get(key, 0)
+            processed += result.get('stats', {}).get('total', 0)
+
+            progress = result.get('progress')
+            if not progress or progress.get('done', True):
+                break
+
+            if not progress.get('next_after_id') or progress['next_after_id'] <= after_id:
+                print(f"   ❌ Error: API did not advance past phone #{processed}")
+                return False
+
+            print(f"   📦 {processed}/{progress['total']} phones processed")
+            after_id = progress['next_after_id']
+
+        message_parts = []
+        if stats['sent']:
+            message_parts.append(f"Sent to {stats['sent']} phone(s)")
+        if stats['skipped']:
+            message_parts.append(f"{stats['skipped']} skipped (already received)")
+        if stats['failed']:
+            message_parts.append(f"{stats['failed']} failed")
+        print(f"   ✅ Successfully submitted: {', '.join(message_parts) or 'Success'}")
+        return True
 
     def log_search(self, status: str, campaigns_found: int, new_campaigns: int, campaign_ids: list = None, error: str = None):
-        """Log the search activity to the database"""
+        """
+        Log the search activity to the database
+
+        The run's start/end times, duration and metrics (phase timings, HTTP
+        counts per endpoint, Reddit rate limit headroom) are sent along.
+        """
+        completed_at = datetime.now(timezone.utc)
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{API_BASE_URL}/api/search-logs",
                 json={
                     'search_type': 'reddit',
@@ -316,7 +837,11 @@ class CoffreeFinder:
                     'new_campaigns': new_campaigns,
                     'campaign_ids': campaign_ids or [],
                     'subreddits_searched': SUBREDDITS,
-                    'error_message': error
+                    'error_message': error,
+                    'started_at': self.metrics.started_at.isoformat(),
+                    'completed_at': completed_at.isoformat(),
+                    'duration_seconds': round((completed_at - self.metrics.started_at).total_seconds()),
+                    'metrics': self.metrics.to_dict()
                 },
                 timeout=10
             )
@@ -325,48 +850,99 @@ class CoffreeFinder:
             print(f"⚠️  Failed to log search: {e}")
             return False
 
-    def record_campaign(self, link: str, reddit_post_url: str = None, reddit_subreddit: str = None) -> tuple[bool, bool]:
+    def print_metrics(self):
+        """Print the time spent per phase and the requests made per endpoint"""
+        snapshot = self.metrics.to_dict()
+        if snapshot['phases']:
+            print("⏱️  Phases: " + ", ".join(f"{name} {seconds:.1f}s" for name, seconds in snapshot['phases'].items()))
+        for name, stats in snapshot['http'].items():
+            extras = ''.join(
+                f", {stats[key]} {key}" for key in ('errors', 'retries') if stats[key]
+            )
+            print(f"🌐 {name}: {stats['calls']} call(s), {stats['seconds']:.1f}s{extras}")
+        remaining = snapshot['reddit_rate_limit']['min_remaining']
+        if remaining is not None:
+            print(f"🚦 Reddit rate limit headroom: {remaining:.0f} request(s) at the lowest point")
+
+    def record_campaigns(self, campaigns: List[Dict]) -> List[tuple[bool, bool, bool]]:
         """
-        Record a campaign in the database
+        Record many campaigns in the database using the batch API
+
+        Campaigns are sent in chunks of CAMPAIGN_BATCH_SIZE over the pooled
+        session, so any number of links costs a handful of round trips. The
+        validation results the API returns are remembered for submit_link.
+
+        Args:
+            campaigns: List of dicts with 'link' and optional 'reddit_post_url'/'reddit_subreddit'
 
         Returns:
-            Tuple of (success, is_new) where:
+            List of (success, is_new, rejected) tuples in the same order as `campaigns`, where:
             - success: True if campaign was recorded or already exists
             - is_new: True if this is a newly created campaign
+            - rejected: True if Capital One reported the campaign expired or invalid,
+              so it will never be recorded and there is nothing to retry
         """
-        try:
-            response = requests.post(
-                f"{API_BASE_URL}/api/campaigns",
-                json={
-                    'full_link': link,
-                    'source': 'auto',
-                    'reddit_post_url': reddit_post_url,
-                    'reddit_subreddit': reddit_subreddit
-                },
-                timeout=10
-            )
+        results: List[tuple[bool, bool, bool]] = []
 
-            if response.ok:
-                result = response.json()
-                # Check if the campaign was newly created or already existed
-                is_new = result.get('created', False)
-                return (True, is_new)
-            else:
-                # Check if it's a duplicate error (campaign already exists)
-                try:
-                    error_data = response.json()
-                    if 'already exists' in error_data.get('error', '').lower():
-                        return (True, False)  # Success but not new
-                except:
-                    pass
-                return (False, False)
+        for start in range(0, len(campaigns), CAMPAIGN_BATCH_SIZE):
+            chunk = campaigns[start:start + CAMPAIGN_BATCH_SIZE]
+            chunk_results: List[tuple[bool, bool, bool]] = []
+            try:
+                response = self.session.post(
+                    f"{API_BASE_URL}/api/campaigns",
+                    json=[{
+                        'full_link': campaign['link'],
+                        'source': 'auto',
+                        'reddit_post_url': campaign.get('reddit_post_url'),
+                        'reddit_subreddit': campaign.get('reddit_subreddit')
+                    } for campaign in chunk],
+                    timeout=60
+                )
+
+                if response.ok:
+                    for item in response.json().get('results', []):
+                        if item.get('error'):
+                            logger.debug(f"Campaign {item.get('campaign_id')} not recorded: {item['error']}")
+                        campaign = item.get('campaign') or {}
+                        # A 'valid' result contradicted by the campaign's flags is left
+                        # unknown, the same as send-coffee's cache does
+                        stale_valid = campaign.get('validation_result') == 'valid' and (
+                            campaign.get('is_valid') is False or campaign.get('is_expired')
+                        )
+                        if campaign.get('validation_result') and campaign.get('last_validated_at') and not stale_valid:
+                            self.remember_validation(
+                                campaign['campaign_id'], campaign['validation_result'], campaign['last_validated_at']
+                            )
+                        elif item.get('campaign_id') and item.get('type') in ('expired', 'invalid'):
+                            # Only definitive rejections; transport errors come back as type 'error'
+                            self.remember_validation(item['campaign_id'], item['type'])
+                        is_new = item.get('created', False)
+                        rejected = item.get('type') in ('expired', 'invalid')
+                        chunk_results.append((is_new or item.get('existing', False), is_new, rejected))
+                else:
+                    print(f"⚠️  Failed to record campaigns: HTTP {response.status_code} {response.text[:200]}")
 
-        except Exception as e:
-            # Campaign might already exist, which is fine
-            if 'already exists' in str(e).lower():
-                return (True, False)
-            print(f"⚠️  Failed to record campaign: {e}")
-            return (False, False)
+            except Exception as e:
+                print(f"⚠️  Failed to record campaigns: {e}")
+
+            # Anything the API didn't answer for counts as not recorded
+            chunk_results += [(False, False, False)] * (len(chunk) - len(chunk_results))
+            results.extend(chunk_results)
+
+        return results
+
+    def record_campaign(self, link: str, reddit_post_url: str = None, reddit_subreddit: str = None) -> tuple[bool, bool, bool]:
+        """
+        Record a single campaign in the database
+
+        Returns:
+            Tuple of (success, is_new, rejected), see record_campaigns
+        """
+        return self.record_campaigns([{
+            'link': link,
+            'reddit_post_url': reddit_post_url,
+            'reddit_subreddit': reddit_subreddit
+        }])[0]
 
     def run(self, timeframe: str = 'month', auto_submit: bool = False):
         """
@@ -386,6 +962,8 @@ class CoffreeFinder:
         logger.info(f"Auto-submit: {'ON' if auto_submit else 'OFF'}")
         logger.info(f"API Base URL: {API_BASE_URL}")
         logger.info(f"Subreddits to search: {', '.join(SUBREDDITS)}")
+        logger.info(f"Workers: {self.workers}")
+        logger.info(f"Incremental: {'ON' if self.incremental else 'OFF'}")
         logger.info("="*80)
 
         print(f"\n🚀 Coffree Finder Starting...")
@@ -394,47 +972,62 @@ class CoffreeFinder:
         print(f"🌐 API: {API_BASE_URL}\n")
 
         all_posts = []
-        all_unique_links = set()
+        # campaign_id -> every place its link was seen, first-seen first
+        all_campaigns: Dict[str, List[CampaignSighting]] = {}
         has_errors = False
 
-        # Search all subreddits
-        for subreddit in SUBREDDITS:
-            try:
-                posts = self.search_reddit(subreddit, timeframe)
-
-                if not posts:
-                    logger.info(f"No posts found in r/{subreddit} (this is normal)")
-
-                for post in posts:
-                    links = self.extract_links_from_post(post)
-
-                    if links:  # Only include posts that have coffree links
-                        logger.debug(f"Found {len(links)} links in post: {post.get('title', '')[:50]}...")
-                        all_unique_links.update(links)
-                        all_posts.append({
-                            'subreddit': subreddit,
-                            'title': post.get('title', ''),
-                            'url': f"https://reddit.com{post.get('permalink', '')}",
-                            'created': datetime.fromtimestamp(post.get('created_utc', 0)),
-                            'links': links
-                        })
-
-                # Be nice to Reddit - rate limit
-                logger.debug(f"Waiting 2 seconds before next subreddit...")
-                time.sleep(2)
-            except Exception as e:
-                logger.error(f"Error processing subreddit r/{subreddit}: {e}", exc_info=True)
-                has_errors = True
+        # Search the subreddits as a few multireddits, concurrently. Request
+        # pacing is handled by the shared rate limiter.
+        with self.metrics.phase('search'), ThreadPoolExecutor(max_workers=self.workers) as pool:
+            searches = [
+                (group, pool.submit(self.search_subreddits, group, timeframe))
+                for group in plan_multireddits(SUBREDDITS)
+            ]
+
+            for group, future in searches:
+                try:
+                    posts_by_subreddit = future.result()
+                except RedditAuthError as e:
+                    self.exit_auth_failed(e)
+                except Exception as e:
+                    logger.error(f"Error searching r/{'+'.join(group)}: {e}", exc_info=True)
+                    has_errors = True
+                    continue
+
+                for subreddit in group:
+                    try:
+                        posts = posts_by_subreddit.get(subreddit, [])
+
+                        if not posts:
+                            logger.info(f"No posts found in r/{subreddit} (this is normal)")
+
+                        for post in posts:
+                            links = self.index_post(subreddit, post, all_campaigns)
+
+                            if links:  # Only include posts that have coffree links
+                                logger.debug(f"Found {len(links)} links in post: {post.get('title', '')[:50]}...")
+                                all_posts.append({
+                                    'subreddit': subreddit,
+                                    'title': post.get('title', ''),
+                                    'url': f"https://reddit.com{post.get('permalink', '')}",
+                                    'created': datetime.fromtimestamp(post.get('created_utc', 0)),
+                                    'links': links
+                                })
+                    except Exception as e:
+                        logger.error(f"Error processing subreddit r/{subreddit}: {e}", exc_info=True)
+                        has_errors = True
 
         # Process found posts
-        logger.info(f"Search complete. Found {len(all_posts)} posts with {len(all_unique_links)} unique links")
+        logger.info(f"Search complete. Found {len(all_posts)} posts with {len(all_campaigns)} unique campaigns")
         print(f"\n📊 Summary:")
         print(f"   Total posts with coffree links: {len(all_posts)}")
-        print(f"   Total unique links found: {len(all_unique_links)}")
+        print(f"   Total unique campaigns found: {len(all_campaigns)}")
 
         if not all_posts:
             logger.info("No coffree links found in any subreddit (this timeframe may not have any)")
             print("\n   No coffree links found.")
+            if self.incremental:
+                self.save_state()
             # Log the search (no results is not necessarily an error)
             self.log_search(
                 status='no_results',
@@ -465,33 +1058,45 @@ class CoffreeFinder:
             print(f"   Reddit URL: {post_info['url']}")
             print(f"   Links found in this post ({len(post_info['links'])}):")
 
-            for link in post_info['links']:
-                campaign_id = self.parse_campaign_id(link)
-                print(f"      - {link}")
-                print(f"        Campaign ID: {campaign_id}")
+            for link, source_url in post_info['links']:
+                print(f"      - {link.raw_url}")
+                print(f"        Campaign ID: {link.campaign_id}")
+                if source_url != post_info['url']:
+                    print(f"        Found in comment: {source_url}")
 
             print()
 
-        # Record all found campaigns in the database
+        # Drop campaigns that were already sent to subscribers (one bulk lookup)
+        with self.metrics.phase('check'):
+            submitted_ids = self.get_submitted_campaign_ids(all_campaigns)
+        new_sightings = [sightings[0] for cid, sightings in all_campaigns.items() if cid not in submitted_ids]
+        new_links = [sighting.link for sighting in new_sightings]
+        already_submitted_count = len(all_campaigns) - len(new_links)
+        if already_submitted_count:
+            print(f"⏭️  Skipping {already_submitted_count} link(s) for campaigns that were already submitted")
+
+        # Record all new campaigns in the database
         print(f"\n{'='*80}")
         print("Recording Campaigns:")
         print(f"{'='*80}\n")
 
+        # Record everything in one batch request, crediting where each campaign was first seen
+        campaigns_to_record = [{
+            'link': sighting.link.url,
+            'reddit_post_url': sighting.source_url,
+            'reddit_subreddit': sighting.subreddit
+        } for sighting in new_sightings]
+
+        with self.metrics.phase('record'):
+            record_results = self.record_campaigns(campaigns_to_record)
+
         recorded_count = 0
+        rejected_count = 0
         new_campaigns_count = 0
-        for link in all_unique_links:
-            campaign_id = self.parse_campaign_id(link)
-
-            # Find the Reddit post info for this link
-            reddit_post_url = None
-            reddit_subreddit = None
-            for post_info in all_posts:
-                if link in post_info['links']:
-                    reddit_post_url = post_info['url']
-                    reddit_subreddit = post_info['subreddit']
-                    break
-
-            success, is_new = self.record_campaign(link, reddit_post_url, reddit_subreddit)
+        # Campaigns with nothing left to do: recorded (and, with auto-submit, submitted) or rejected
+        done_ids = set()
+        for link, (success, is_new, rejected) in zip(new_links, record_results):
+            campaign_id = link.campaign_id
             if success:
                 if is_new:
                     print(f"✅ Recorded NEW Campaign ID: {campaign_id}")
@@ -499,10 +1104,16 @@ class CoffreeFinder:
                 else:
                     print(f"ℹ️  Campaign ID already exists: {campaign_id}")
                 recorded_count += 1
+                if not auto_submit:
+                    done_ids.add(campaign_id)
+            elif rejected:
+                print(f"⏰ Campaign ID rejected as expired or invalid: {campaign_id}")
+                rejected_count += 1
+                done_ids.add(campaign_id)
             else:
                 print(f"⚠️  Could not record Campaign ID: {campaign_id}")
 
-        print(f"\nRecorded {recorded_count}/{len(all_unique_links)} campaigns ({new_campaigns_count} new)\n")
+        print(f"\nRecorded {recorded_count}/{len(new_links)} campaigns ({new_campaigns_count} new, {rejected_count} rejected)\n")
 
         # Now process submissions if auto_submit is enabled
         submitted_count = 0
@@ -514,27 +1125,40 @@ class CoffreeFinder:
             print("Submitting Links:")
             print(f"{'='*80}\n")
 
-            for link in all_unique_links:
-                campaign_id = self.parse_campaign_id(link)
-                print(f"🔗 Submitting Campaign ID: {campaign_id}")
-                print(f"   Link: {link}")
+            for link in new_links:
+                print(f"🔗 Submitting Campaign ID: {link.campaign_id}")
+                print(f"   Link: {link.url}")
 
                 # Try to submit
-                if self.submit_link(link):
+                with self.metrics.phase('submit'):
+                    submitted = self.submit_link(link.url)
+                if submitted:
                     submitted_count += 1
                 else:
                     failed_count += 1
+                if submitted or self.is_rejected(link.campaign_id):
+                    done_ids.add(link.campaign_id)
 
                 print()
         else:
-            skipped_count = len(all_unique_links)
+            skipped_count = len(new_links)
+
+        # Only advance the cursors once every campaign is done with, so a run that
+        # hit API or network errors while recording or submitting re-scans the
+        # same window next time instead of losing links
+        if self.incremental:
+            if len(done_ids) == len(new_links):
+                self.save_state()
+            else:
+                logger.warning("Not advancing incremental state because some campaigns were not recorded or submitted")
 
         # Final summary
         logger.info("="*80)
         logger.info("Final Summary")
         logger.info("="*80)
         logger.info(f"Posts found: {len(all_posts)}")
-        logger.info(f"Unique links: {len(all_unique_links)}")
+        logger.info(f"Unique campaigns: {len(all_campaigns)}")
+        logger.info(f"Already submitted: {already_submitted_count}")
         if auto_submit:
             logger.info(f"Successfully submitted: {submitted_count}")
             logger.info(f"Failed/Duplicates: {failed_count}")
@@ -546,7 +1170,8 @@ class CoffreeFinder:
         print("Final Summary:")
         print(f"{'='*80}")
         print(f"📄 Posts found: {len(all_posts)}")
-        print(f"🔗 Unique links: {len(all_unique_links)}")
+        print(f"🔗 Unique campaigns: {len(all_campaigns)}")
+        print(f"⏭️  Already submitted: {already_submitted_count}")
         if auto_submit:
             print(f"✅ Successfully submitted: {submitted_count}")
             print(f"❌ Failed/Duplicates: {failed_count}")
@@ -557,15 +1182,14 @@ class CoffreeFinder:
         duration = int(time_module.time() - start_time)
         logger.info(f"Search completed in {duration} seconds")
         print(f"\n⏱️  Search completed in {duration} seconds")
+        self.print_metrics()
         print(f"📊 Logging search activity...")
 
-        # Extract campaign IDs from all unique links
-        campaign_ids = [self.parse_campaign_id(link) for link in all_unique_links]
-        campaign_ids = [cid for cid in campaign_ids if cid]  # Filter out None values
+        campaign_ids = list(all_campaigns)
 
         log_success = self.log_search(
             status='success',
-            campaigns_found=len(all_unique_links),
+            campaigns_found=len(all_campaigns),
             new_campaigns=new_campaigns_count,
             campaign_ids=campaign_ids
         )
@@ -584,6 +1208,463 @@ class CoffreeFinder:
         print("\n✅ Coffree Finder completed successfully!")
 
 
+    def process_campaign(self, sighting: CampaignSighting, discovered_at: float, auto_submit: bool) -> Dict:
+        """
+        Check, record and (optionally) submit one newly discovered campaign
+
+        Used by the streaming pipeline, which calls it as soon as a campaign is
+        first extracted.
+
+        Args:
+            sighting: Where the campaign was first seen
+            discovered_at: time.monotonic() when the campaign was extracted
+            auto_submit: If True, submit the link after recording it
+
+        Returns:
+            Dict with the campaign ID, outcome flags and latency in seconds. 'done'
+            is True when nothing is left to do for the campaign: it was already
+            submitted, is expired or invalid, or was recorded and (with
+            auto_submit) submitted.
+        """
+        link = sighting.link
+        outcome = {
+            'campaign_id': link.campaign_id,
+            'already_submitted': False,
+            'recorded': False,
+            'is_new': False,
+            'rejected': False,
+            'submitted': False,
+            'done': False,
+            'latency': None,
+        }
+
+        with self.metrics.phase('check'):
+            already_submitted = link.campaign_id in self.get_submitted_campaign_ids([link.campaign_id])
+        if already_submitted:
+            outcome['already_submitted'] = outcome['done'] = True
+            print(f"⏭️  Campaign {link.campaign_id} was already submitted")
+            return outcome
+
+        with self.metrics.phase('record'):
+            outcome['recorded'], outcome['is_new'], outcome['rejected'] = self.record_campaigns([{
+                'link': link.url,
+                'reddit_post_url': sighting.source_url,
+                'reddit_subreddit': sighting.subreddit
+            }])[0]
+
+        if auto_submit:
+            print(f"🔗 Submitting Campaign ID: {link.campaign_id}")
+            with self.metrics.phase('submit'):
+                outcome['submitted'] = self.submit_link(link.url)
+            outcome['rejected'] = outcome['rejected'] or self.is_rejected(link.campaign_id)
+
+        outcome['done'] = outcome['rejected'] or (outcome['submitted'] if auto_submit else outcome['recorded'])
+        outcome['latency'] = time.monotonic() - discovered_at
+        post_age = datetime.now() - sighting.created
+        print(f"⚡ Campaign {link.campaign_id} {'submitted' if outcome['submitted'] else 'recorded' if outcome['recorded'] else 'rejected' if outcome['rejected'] else 'failed'} "
+              f"{outcome['latency']:.1f}s after discovery "
+              f"(posted {int(post_age.total_seconds() // 60)} min ago in r/{sighting.subreddit})")
+        return outcome
+
+    def dispatch_new_campaigns(self, subreddit: str, post: Dict, index: Dict[str, List[CampaignSighting]],
+                               index_lock: threading.Lock, pipeline: ThreadPoolExecutor,
+                               auto_submit: bool) -> tuple[List[tuple[CoffreeLink, str]], Dict[str, Future]]:
+        """
+        Index a post and start processing every campaign it is the first sighting of
+
+        Args:
+            subreddit: Subreddit the post was found in
+            post: Reddit post data dictionary
+            index: Campaign provenance index shared by the run
+            index_lock: Guards `index` across scan threads
+            pipeline: Executor that runs process_campaign
+            auto_submit: If True, submit new links after recording them
+
+        Returns:
+            The post's (link, source URL) pairs and the futures of the campaigns it started, by campaign ID
+        """
+        discovered_at = time.monotonic()
+        with index_lock:
+            before = set(index)
+            links = self.index_post(subreddit, post, index)
+            new_ids = {link.campaign_id for link, _ in links} - before
+            new_sightings = [index[cid][0] for cid in new_ids]
+
+        futures = {}
+        for sighting in new_sightings:
+            logger.info(f"New campaign {sighting.link.campaign_id} in r/{subreddit}")
+            futures[sighting.link.campaign_id] = pipeline.submit(
+                self.process_campaign, sighting, discovered_at, auto_submit
+            )
+        return links, futures
+
+    def run_streaming(self, timeframe: str = 'month', auto_submit: bool = False):
+        """
+        Streaming run - record and submit each campaign as soon as it is found
+
+        Scan workers push every newly seen campaign to a small pool that
+        checks, records and submits it while the scan continues, instead of
+        waiting for every subreddit to finish. Time-to-submit is reported per
+        campaign.
+
+        Args:
+            timeframe: Time period to search (hour, day, week, month, year, all)
+            auto_submit: If True, automatically submit new links
+        """
+        start_time = time.monotonic()
+
+        logger.info("="*80)
+        logger.info("Starting Coffree Finder Run (streaming)")
+        logger.info("="*80)
+        logger.info(f"Timeframe: {timeframe}")
+        logger.info(f"Auto-submit: {'ON' if auto_submit else 'OFF'}")
+        logger.info(f"API Base URL: {API_BASE_URL}")
+        logger.info(f"Subreddits to search: {', '.join(SUBREDDITS)}")
+        logger.info(f"Workers: {self.workers}")
+        logger.info(f"Incremental: {'ON' if self.incremental else 'OFF'}")
+        logger.info("="*80)
+
+        print(f"\n🚀 Coffree Finder Starting (streaming)...")
+        print(f"📅 Timeframe: {timeframe}")
+        print(f"🤖 Auto-submit: {'ON' if auto_submit else 'OFF'}")
+        print(f"🌐 API: {API_BASE_URL}\n")
+
+        all_campaigns: Dict[str, List[CampaignSighting]] = {}
+        index_lock = threading.Lock()
+        post_count = 0
+        has_errors = False
+        pipeline = ThreadPoolExecutor(max_workers=STREAM_WORKERS)
+        pending = []
+
+        def on_post(subreddit: str, post: Dict):
+            nonlocal post_count
+            links, futures = self.dispatch_new_campaigns(
+                subreddit, post, all_campaigns, index_lock, pipeline, auto_submit
+            )
+            with index_lock:
+                post_count += bool(links)
+            pending.extend(futures.values())
+
+        with self.metrics.phase('search'), ThreadPoolExecutor(max_workers=self.workers) as pool:
+            searches = {
+                pool.submit(self.search_subreddits, group, timeframe, on_post): '+'.join(group)
+                for group in plan_multireddits(SUBREDDITS)
+            }
+            for future in as_completed(searches):
+                try:
+                    future.result()
+                except RedditAuthError as e:
+                    pipeline.shutdown(wait=False, cancel_futures=True)
+                    self.exit_auth_failed(e)
+                except Exception as e:
+                    logger.error(f"Error searching r/{searches[future]}: {e}", exc_info=True)
+                    has_errors = True
+
+        scan_seconds = time.monotonic() - start_time
+        pipeline.shutdown(wait=True)
+
+        outcomes = []
+        for future in pending:
+            try:
+                outcomes.append(future.result())
+            except Exception as e:
+                logger.error(f"Error processing campaign: {e}", exc_info=True)
+                has_errors = True
+
+        handled = [o for o in outcomes if not o['already_submitted']]
+        recorded_count = sum(1 for o in handled if o['recorded'])
+        new_campaigns_count = sum(1 for o in handled if o['is_new'])
+        submitted_count = sum(1 for o in handled if o['submitted'])
+        latencies = sorted(o['latency'] for o in handled if o['latency'] is not None)
+
+        # Expired/invalid campaigns are done with; only API or network failures
+        # while recording or submitting hold the cursors back
+        if self.incremental:
+            if all(o['done'] for o in outcomes) and len(outcomes) == len(pending):
+                self.save_state()
+            else:
+                logger.warning("Not advancing incremental state because some campaigns were not recorded or submitted")
+
+        print(f"\n{'='*80}")
+        print("Final Summary:")
+        print(f"{'='*80}")
+        print(f"📄 Posts found: {post_count}")
+        print(f"🔗 Unique campaigns: {len(all_campaigns)}")
+        print(f"⏭️  Already submitted: {len(outcomes) - len(handled)}")
+        print(f"📝 Recorded: {recorded_count} ({new_campaigns_count} new)")
+        if auto_submit:
+            print(f"✅ Successfully submitted: {submitted_count}")
+            print(f"❌ Failed/Duplicates: {len(handled) - submitted_count}")
+        if latencies:
+            print(f"⚡ Time to {'submit' if auto_submit else 'record'}: "
+                  f"min {latencies[0]:.1f}s, median {latencies[len(latencies) // 2]:.1f}s, max {latencies[-1]:.1f}s")
+        print(f"🔍 Scan finished after {scan_seconds:.1f}s")
+
+        duration = int(time.monotonic() - start_time)
+        logger.info(f"Search completed in {duration} seconds")
+        print(f"\n⏱️  Search completed in {duration} seconds")
+        self.print_metrics()
+
+        log_success = self.log_search(
+            status='success' if all_campaigns else 'no_results',
+            campaigns_found=len(all_campaigns),
+            new_campaigns=new_campaigns_count,
+            campaign_ids=list(all_campaigns)
+        )
+        if not log_success:
+            logger.warning("Failed to log search activity to database")
+
+        if has_errors:
+            logger.error("Exiting with error code due to errors during search")
+            sys.exit(1)
+
+        logger.info("Coffree Finder completed successfully")
+        print("\n✅ Coffree Finder completed successfully!")
+
+    def _watch_item_to_post(self, kind: str, item) -> Dict:
+        """Convert a streamed submission or comment to a post dictionary for indexing"""
+        if kind == 'submissions':
+            return self._submission_to_post(item)
+
+        permalink = f"https://reddit.com{item.permalink}"
+        return {
+            'permalink': item.permalink,
+            'created_utc': item.created_utc,
+            'id': item.id,
+            'author': str(item.author) if item.author else '[deleted]',
+            'comment_links': [(link, permalink) for link in extract_links(item.body)],
+        }
+
+    def run_watch(self, auto_submit: bool = False):
+        """
+        Watch mode - follow new submissions and comments until stopped
+
+        Streams a multireddit of SUBREDDITS and hands each newly seen campaign
+        to the same pipeline as streaming mode, so links are handled seconds
+        after they are posted. Each poll is one listing request per stream,
+        and polls that find nothing new back off from WATCH_IDLE_INITIAL to
+        WATCH_IDLE_MAX seconds apart, far fewer calls than repeating
+        full-window searches.
+
+        Per stream, the newest item whose campaigns are all recorded (or
+        rejected, or already submitted) is checkpointed in the state file, so a
+        restart resumes without re-handling old items. Campaigns that fail to
+        record are retried at the next checkpoint and hold the checkpoint back
+        until they succeed. Stream errors reconnect
+        with exponential backoff; SIGTERM/SIGINT stop after the current item and
+        wait for in-flight campaigns (a second signal exits immediately).
+
+        Args:
+            auto_submit: If True, automatically submit new links
+        """
+        start_time = time.monotonic()
+        stop = threading.Event()
+
+        def request_stop(signum, frame):
+            if stop.is_set():
+                raise KeyboardInterrupt
+            logger.info(f"Received signal {signum} - shutting down")
+            print("\n🛑 Shutting down after the current item (signal again to exit now)...")
+            stop.set()
+
+        signal.signal(signal.SIGTERM, request_stop)
+        signal.signal(signal.SIGINT, request_stop)
+
+        logger.info("="*80)
+        logger.info("Starting Coffree Finder Run (watch)")
+        logger.info("="*80)
+        logger.info(f"Auto-submit: {'ON' if auto_submit else 'OFF'}")
+        logger.info(f"API Base URL: {API_BASE_URL}")
+        logger.info(f"Subreddits to watch: {', '.join(SUBREDDITS)}")
+        logger.info(f"State file: {self.state_file}")
+        logger.info("="*80)
+
+        print(f"\n👀 Coffree Finder watching r/{'+'.join(SUBREDDITS)}...")
+        print(f"🤖 Auto-submit: {'ON' if auto_submit else 'OFF'}")
+        print(f"🌐 API: {API_BASE_URL}\n")
+
+        self.watch_checkpoint = self.load_watch_checkpoint()
+        if self.watch_checkpoint:
+            logger.info(f"Resuming streams after checkpoint {self.watch_checkpoint}")
+
+        all_campaigns: Dict[str, List[CampaignSighting]] = {}
+        index_lock = threading.Lock()
+        pipeline = ThreadPoolExecutor(max_workers=STREAM_WORKERS)
+        # Per stream, items seen since its checkpoint (oldest first) with the
+        # futures of the campaigns they started that are not settled yet
+        unsettled: Dict[str, List[Dict]] = {'submissions': [], 'comments': []}
+        outcomes = []
+        has_errors = False
+
+        def settle(final: bool = False):
+            """
+            Collect finished campaigns and move each stream's checkpoint past the
+            items whose campaigns are all done. A campaign that was not recorded
+            (or, with auto-submit, not submitted) is queued again and holds the
+            checkpoint back. With
+            final=True (the pipeline has shut down) everything is collected and
+            nothing is retried.
+            """
+            nonlocal has_errors
+            for kind, entries in unsettled.items():
+                settled = 0
+                blocked = False
+                for entry in entries:
+                    futures = entry['futures']
+                    if not final and not all(future.done() for future in futures.values()):
+                        break
+
+                    for campaign_id, future in list(futures.items()):
+                        try:
+                            outcome = future.result()
+                        except Exception as e:
+                            logger.error(f"Error processing campaign {campaign_id}: {e}", exc_info=True)
+                            has_errors = True
+                            outcome = None
+
+                        if outcome and outcome['done']:
+                            outcomes.append(outcome)
+                            del futures[campaign_id]
+                        elif final:
+                            if outcome:
+                                outcomes.append(outcome)
+                        else:
+                            logger.warning(f"Campaign {campaign_id} was not recorded or submitted - retrying")
+                            with index_lock:
+                                sighting = all_campaigns[campaign_id][0]
+                            futures[campaign_id] = pipeline.submit(
+                                self.process_campaign, sighting, time.monotonic(), auto_submit
+                            )
+
+                    if futures:
+                        blocked = True
+                        if not final:
+                            break
+                    if not blocked:
+                        self.watch_checkpoint[kind] = entry['checkpoint']
+                        settled += 1
+                del entries[:settled]
+
+        streams = None
+        backoff = WATCH_BACKOFF_INITIAL
+        idle = WATCH_IDLE_INITIAL
+        last_checkpoint = time.monotonic()
+
+        try:
+            while not stop.is_set():
+                try:
+                    if streams is None:
+                        multireddit = self.reddit.subreddit('+'.join(SUBREDDITS))
+                        # pause_after=-1 yields None after each response, so both
+                        # streams can be polled in turn from this one thread. PRAW
+                        # never sleeps in this mode; idle polls are paced below.
+                        streams = {
+                            'submissions': multireddit.stream.submissions(pause_after=-1),
+                            'comments': multireddit.stream.comments(pause_after=-1),
+                        }
+                        logger.info("Connected to submission and comment streams")
+
+                    new_items = 0
+                    for kind, stream in streams.items():
+                        for item in stream:
+                            if item is None:
+                                # One listing request was made; keep it within the shared quota
+                                self.rate_limiter.acquire()
+                                break
+                            new_items += 1
+
+                            checkpoint = self.watch_checkpoint.get(kind)
+                            if checkpoint and item.created_utc <= checkpoint['created_utc']:
+                                continue  # Handled before the last restart
+
+                            post = self._watch_item_to_post(kind, item)
+                            links, futures = self.dispatch_new_campaigns(
+                                item.subreddit.display_name, post, all_campaigns, index_lock, pipeline, auto_submit
+                            )
+                            if links:
+                                print(f"📄 New {kind[:-1]} with coffree links: https://reddit.com{item.permalink}")
+                            unsettled[kind].append({
+                                'checkpoint': {
+                                    'created_utc': item.created_utc,
+                                    'fullname': item.fullname,
+                                },
+                                'futures': futures,
+                            })
+
+                            if stop.is_set():
+                                break
+                        if stop.is_set():
+                            break
+
+                    backoff = WATCH_BACKOFF_INITIAL
+                    if new_items:
+                        idle = WATCH_IDLE_INITIAL
+                    else:
+                        stop.wait(idle)
+                        idle = min(idle * 2, WATCH_IDLE_MAX)
+
+                except Exception as e:
+                    if is_auth_error(e):
+                        # Reconnecting will not help; stop like a signal would
+                        logger.error(f"❌ Failed to connect to Reddit API: {e}")
+                        logger.error("This usually means your credentials are invalid or expired")
+                        has_errors = True
+                        break
+                    logger.error(f"Stream error: {e} - reconnecting in {backoff}s", exc_info=True)
+                    print(f"⚠️  Stream error: {e} - reconnecting in {backoff}s")
+                    streams = None
+                    stop.wait(backoff)
+                    backoff = min(backoff * 2, WATCH_BACKOFF_MAX)
+
+                if time.monotonic() - last_checkpoint >= WATCH_CHECKPOINT_INTERVAL:
+                    settle()
+                    self.save_state()
+                    # Watch runs indefinitely, so keep the cache bounded as it goes
+                    if self.cache:
+                        self.cache.prune()
+                    last_checkpoint = time.monotonic()
+
+        finally:
+            pipeline.shutdown(wait=True)
+            settle(final=True)
+            self.save_state()
+
+        handled = [o for o in outcomes if not o['already_submitted']]
+        recorded_count = sum(1 for o in handled if o['recorded'])
+        new_campaigns_count = sum(1 for o in handled if o['is_new'])
+        submitted_count = sum(1 for o in handled if o['submitted'])
+
+        print(f"\n{'='*80}")
+        print("Watch Summary:")
+        print(f"{'='*80}")
+        print(f"🔗 Unique campaigns: {len(all_campaigns)}")
+        print(f"⏭️  Already submitted: {len(outcomes) - len(handled)}")
+        print(f"📝 Recorded: {recorded_count} ({new_campaigns_count} new)")
+        if auto_submit:
+            print(f"✅ Successfully submitted: {submitted_count}")
+            print(f"❌ Failed/Duplicates: {len(handled) - submitted_count}")
+
+        duration = int(time.monotonic() - start_time)
+        logger.info(f"Watch stopped after {duration} seconds")
+        print(f"\n⏱️  Watched for {duration} seconds")
+        self.print_metrics()
+
+        log_success = self.log_search(
+            status='success' if all_campaigns else 'no_results',
+            campaigns_found=len(all_campaigns),
+            new_campaigns=new_campaigns_count,
+            campaign_ids=list(all_campaigns)
+        )
+        if not log_success:
+            logger.warning("Failed to log search activity to database")
+
+        if has_errors:
+            logger.error("Exiting with error code due to errors while watching")
+            sys.exit(1)
+
+        logger.info("Coffree Finder watch stopped cleanly")
+        print("\n✅ Coffree Finder stopped cleanly!")
+
 def main():
     """Main entry point"""
     import argparse
@@ -607,14 +1688,97 @@ def main():
         default='http://localhost:3001',
         help='Base URL for the API (default: http://localhost:3001)'
     )
+    parser.add_argument(
+        '--stream',
+        action='store_true',
+        help='Record and submit each campaign as soon as it is found instead of after the full scan'
+    )
+    parser.add_argument(
+        '--watch',
+        action='store_true',
+        help='Run until stopped, following new posts and comments via Reddit streams'
+    )
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help='Only fetch posts newer than the per-subreddit cursor saved by the previous run'
+    )
+    parser.add_argument(
+        '--state-file',
+        default=STATE_FILE,
+        help=f'Where incremental cursors and the watch checkpoint are stored (default: {STATE_FILE})'
+    )
+    parser.add_argument(
+        '--cache-file',
+        default=CACHE_FILE,
+        help=f'SQLite cache of comment-tree scans (default: {CACHE_FILE})'
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Always expand comment trees instead of using the scan cache'
+    )
+    parser.add_argument(
+        '--send-concurrency',
+        type=int,
+        help='Concurrent sends per link the API should use (capped server-side)'
+    )
+    parser.add_argument(
+        '--send-priority',
+        choices=['high', 'normal', 'low'],
+        help='Priority hint for the API send concurrency when --send-concurrency is not given'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f'Concurrent Reddit search/comment workers (default: {DEFAULT_WORKERS})'
+    )
+    parser.add_argument(
+        '--metrics-file',
+        help='Also write run metrics to this file in Prometheus text format (e.g. for node_exporter)'
+    )
+    parser.add_argument(
+        '--token-file',
+        default=TOKEN_FILE,
+        help=f'Where the Reddit access token is cached between runs (default: {TOKEN_FILE})'
+    )
+    parser.add_argument(
+        '--no-token-cache',
+        action='store_true',
+        help='Fetch a new Reddit access token instead of reusing a cached one'
+    )
+    add_profile_argument(parser)
 
     args = parser.parse_args()
 
     # Set API URL from argument
     os.environ['API_BASE_URL'] = args.api_url
 
-    finder = CoffreeFinder()
-    finder.run(timeframe=args.timeframe, auto_submit=args.auto_submit)
+    # Startup (Reddit login) is profiled too
+    with profile(args.profile, 'coffree_finder'):
+        finder = CoffreeFinder(
+            workers=args.workers,
+            incremental=args.incremental,
+            state_file=args.state_file,
+            cache_file=None if args.no_cache else args.cache_file,
+            send_concurrency=args.send_concurrency,
+            send_priority=args.send_priority,
+            token_file=None if args.no_token_cache else args.token_file
+        )
+        try:
+            if args.watch:
+                finder.run_watch(auto_submit=args.auto_submit)
+            elif args.stream:
+                finder.run_streaming(timeframe=args.timeframe, auto_submit=args.auto_submit)
+            else:
+                finder.run(timeframe=args.timeframe, auto_submit=args.auto_submit)
+        finally:
+            finder.save_reddit_token()
+            finder.close_cache()
+            # Written even when the run exits with an error, so failed runs show up too
+            if args.metrics_file:
+                finder.metrics.write_prometheus(args.metrics_file)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Coffree Links - Single-pass extraction and normalization of Capital One coffree links
+
+Examples in the docstrings run with: python3 -m doctest coffree_links.py
+"""
+
+import re
+import html
+from typing import List, NamedTuple, Optional
+from urllib.parse import urlparse, parse_qs
+
+# Compiled once; matches raw links including HTML-escaped query strings (&amp;)
+COFFREE_PATTERN = re.compile(r'https?://coffree\.capitalone\.com/sms/\?[^"\s<>]+')
+
+# Campaign IDs are letters, digits, '_' and '-'; anything after that (e.g. a
+# markdown ")" or sentence-ending ".") is dropped
+CAMPAIGN_ID_PATTERN = re.compile(r'[A-Za-z0-9_-]+')
+
+# Marketing channels only contain letters (matches the API's sanitization)
+NON_LETTERS = re.compile(r'[^a-zA-Z]')
+
+
+class CoffreeLink(NamedTuple):
+    """A coffree link normalized to its campaign"""
+    campaign_id: str
+    marketing_channel: str
+    url: str  # Canonical link: https://coffree.capitalone.com/sms/?cid=...&mc=...
+    raw_url: str  # The link as it appeared in the text (HTML entities decoded)
+
+    @property
+    def key(self) -> tuple:
+        """Canonical (cid, mc) key"""
+        return (self.campaign_id, self.marketing_channel)
+
+
+def normalize_link(raw_url: str) -> Optional[CoffreeLink]:
+    """
+    Normalize a raw coffree URL to a CoffreeLink
+
+    Tracking parameters and anything other than cid/mc are dropped.
+
+    Returns:
+        CoffreeLink, or None if the URL has no usable cid and mc
+
+    Trailing punctuation picked up from the surrounding text is not part of the cid:
+
+    >>> normalize_link('https://coffree.capitalone.com/sms/?mc=REDDIT&cid=abc123).').url
+    'https://coffree.capitalone.com/sms/?cid=abc123&mc=REDDIT'
+    >>> normalize_link('https://coffree.capitalone.com/sms/?cid=ab_c-12&mc=REDDIT').campaign_id
+    'ab_c-12'
+    >>> normalize_link('https://coffree.capitalone.com/sms/?cid=).&mc=REDDIT') is None
+    True
+    """
+    url = html.unescape(raw_url)
+    try:
+        params = parse_qs(urlparse(url).query)
+    except ValueError:
+        return None
+
+    cid_match = CAMPAIGN_ID_PATTERN.match(params.get('cid', [''])[0])
+    marketing_channel = NON_LETTERS.sub('', params.get('mc', [''])[0])
+    if not cid_match or not marketing_channel:
+        return None
+
+    campaign_id = cid_match.group()
+    return CoffreeLink(
+        campaign_id=campaign_id,
+        marketing_channel=marketing_channel,
+        url=f"https://coffree.capitalone.com/sms/?cid={campaign_id}&mc={marketing_channel}",
+        raw_url=url,
+    )
+
+
+def extract_links(*texts: str) -> List[CoffreeLink]:
+    """
+    Extract coffree links from any number of text fields in one pass
+
+    Args:
+        texts: Text fields to scan (post title, selftext, URL, comment bodies...)
+
+    Returns:
+        Normalized links in order of first appearance, one per (cid, mc)
+
+    >>> [link.campaign_id for link in extract_links(
+    ...     'Free coffee: https://coffree.capitalone.com/sms/?cid=abc123&mc=REDDIT.',
+    ...     '[same](https://coffree.capitalone.com/sms/?mc=REDDIT&cid=abc123).',
+    ... )]
+    ['abc123']
+    """
+    text = '\n'.join(t for t in texts if t)
+    links = []
+    seen = set()
+
+    for match in COFFREE_PATTERN.finditer(text):
+        link = normalize_link(match.group())
+        if link and link.key not in seen:
+            seen.add(link.key)
+            links.append(link)
+
+    return links
@@ -9,9 +9,13 @@ CREATE TABLE IF NOT EXISTS search_logs (
   error_message TEXT,
   started_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
   completed_at TIMESTAMP WITH TIME ZONE,
-  duration_seconds INTEGER
+  duration_seconds INTEGER,
+  metrics JSONB -- Per-phase timings, HTTP calls/errors/retries per endpoint, Reddit rate limit headroom
 );
 
+-- Run metrics column for databases created before it was added
+ALTER TABLE search_logs ADD COLUMN IF NOT EXISTS metrics JSONB;
+
 -- Create campaigns table to track all discovered campaigns
 CREATE TABLE IF NOT EXISTS campaigns (
   id BIGSERIAL PRIMARY KEY,
@@ -23,17 +27,119 @@ CREATE TABLE IF NOT EXISTS campaigns (
   reddit_subreddit VARCHAR(50), -- Which subreddit it was found in
   first_seen_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
   first_submitted_at TIMESTAMP WITH TIME ZONE, -- When first sent to subscribers
+  fanout_completed_at TIMESTAMP WITH TIME ZONE, -- When send-coffee finished sending to every subscriber
   is_valid BOOLEAN DEFAULT true, -- If campaign has been tested and works
   is_expired BOOLEAN DEFAULT false, -- If campaign is expired/invalid
-  notes TEXT
+  notes TEXT,
+  last_validated_at TIMESTAMP WITH TIME ZONE, -- When Capital One was last probed for this campaign
+  validation_result VARCHAR(20) CHECK (validation_result IN ('valid', 'expired', 'invalid')) -- Cached probe result, trusted for CAMPAIGN_VALIDATION_TTL_SECONDS
 );
 
+-- Validation cache columns for databases created before they were added
+ALTER TABLE campaigns ADD COLUMN IF NOT EXISTS last_validated_at TIMESTAMP WITH TIME ZONE;
+ALTER TABLE campaigns ADD COLUMN IF NOT EXISTS validation_result VARCHAR(20)
+  CHECK (validation_result IN ('valid', 'expired', 'invalid'));
+
+-- Fan-out completion for databases created before it was added. Campaigns that
+-- were already sent at that point count as fully sent as of their first send.
+DO $$
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM information_schema.columns
+    WHERE table_name = 'campaigns' AND column_name = 'fanout_completed_at'
+  ) THEN
+    ALTER TABLE campaigns ADD COLUMN fanout_completed_at TIMESTAMP WITH TIME ZONE;
+    UPDATE campaigns c
+    SET fanout_completed_at = l.first_sent_at
+    FROM (
+      SELECT campaign_id, MIN(created_at) AS first_sent_at
+      FROM message_logs
+      GROUP BY campaign_id
+    ) l
+    WHERE l.campaign_id = c.campaign_id;
+  END IF;
+END $$;
+
 -- Create indexes
 CREATE INDEX IF NOT EXISTS idx_search_logs_started_at ON search_logs(started_at DESC);
 CREATE INDEX IF NOT EXISTS idx_campaigns_first_seen ON campaigns(first_seen_at DESC);
 CREATE INDEX IF NOT EXISTS idx_campaigns_source ON campaigns(source);
 CREATE INDEX IF NOT EXISTS idx_campaigns_campaign_id ON campaigns(campaign_id);
 
+-- Which of the given campaigns have been sent to every subscriber (used by POST
+-- /api/check-campaign). A fan-out that stopped partway is not listed, so the
+-- finder submits the campaign again and send-coffee resumes with the phones
+-- that have not received it.
+CREATE OR REPLACE FUNCTION submitted_campaign_ids(cids TEXT[])
+RETURNS TABLE (campaign_id VARCHAR, submitted_at TIMESTAMP WITH TIME ZONE)
+LANGUAGE sql STABLE
+AS $$
+  SELECT campaign_id, fanout_completed_at AS submitted_at
+  FROM campaigns
+  WHERE campaign_id = ANY(cids)
+    AND fanout_completed_at IS NOT NULL;
+$$;
+
+-- (campaign, phone) pairs that still need a send: valid campaigns (not cached as
+-- expired/invalid) x phones with no successful log, whose latest failure (if any)
+-- was a network error.
+-- Keyset-paginated on (campaign_id, phone); used by retry_failed.py. The key is
+-- split so the campaign bound is a plain range on campaigns.campaign_id (served by
+-- its unique index) and the phone bound only applies within after_campaign; a row
+-- comparison across the CROSS JOIN could not use either index.
+-- Relies on idx_message_logs_campaign_phone_status from supabase-schema.sql.
+CREATE OR REPLACE FUNCTION pending_deliveries(
+  after_campaign TEXT DEFAULT '',
+  after_phone TEXT DEFAULT '',
+  page_size INTEGER DEFAULT 1000
+)
+RETURNS TABLE (
+  campaign_id VARCHAR,
+  marketing_channel VARCHAR,
+  full_link TEXT,
+  phone VARCHAR,
+  platform VARCHAR,
+  last_error TEXT,
+  previously_failed BOOLEAN
+)
+LANGUAGE sql STABLE
+AS $$
+  SELECT
+    c.campaign_id,
+    c.marketing_channel,
+    c.full_link,
+    p.phone,
+    p.platform,
+    f.error_message AS last_error,
+    f.id IS NOT NULL AS previously_failed
+  FROM campaigns c
+  CROSS JOIN phone_numbers p
+  LEFT JOIN LATERAL (
+    SELECT l.id, l.error_message
+    FROM message_logs l
+    WHERE l.campaign_id = c.campaign_id
+      AND l.phone_number = p.phone
+      AND l.status = 'failed'
+    ORDER BY l.id DESC
+    LIMIT 1
+  ) f ON true
+  WHERE c.is_valid
+    AND NOT c.is_expired
+    AND COALESCE(c.validation_result, 'valid') = 'valid'
+    AND c.campaign_id >= after_campaign
+    AND (c.campaign_id > after_campaign OR p.phone > after_phone)
+    AND NOT EXISTS (
+      SELECT 1
+      FROM message_logs s
+      WHERE s.campaign_id = c.campaign_id
+        AND s.phone_number = p.phone
+        AND s.status = 'success'
+    )
+    AND (f.id IS NULL OR f.error_message ILIKE '%network%')
+  ORDER BY c.campaign_id, p.phone
+  LIMIT page_size;
+$$;
+
 -- Enable Row Level Security
 ALTER TABLE search_logs ENABLE ROW LEVEL SECURITY;
 ALTER TABLE campaigns ENABLE ROW LEVEL SECURITY;
@@ -22,6 +22,18 @@ CREATE TABLE IF NOT EXISTS message_logs (
 CREATE INDEX IF NOT EXISTS idx_message_logs_created_at ON message_logs(created_at DESC);
 CREATE INDEX IF NOT EXISTS idx_message_logs_phone ON message_logs(phone_number);
 CREATE INDEX IF NOT EXISTS idx_message_logs_campaign ON message_logs(campaign_id);
+CREATE INDEX IF NOT EXISTS idx_message_logs_campaign_phone_status ON message_logs(campaign_id, phone_number, status);
+CREATE INDEX IF NOT EXISTS idx_message_logs_success_phone ON message_logs(phone_number) WHERE status = 'success';
+
+-- Distinct phones with at least one successful send (used by GET /api/logs/successful-phones)
+CREATE OR REPLACE FUNCTION successful_phone_numbers()
+RETURNS TEXT[]
+LANGUAGE sql STABLE
+AS $$
+  SELECT COALESCE(array_agg(DISTINCT phone_number), '{}')
+  FROM message_logs
+  WHERE status = 'success';
+$$;
 
 -- Enable Row Level Security (RLS)
 ALTER TABLE phone_numbers ENABLE ROW LEVEL SECURITY;
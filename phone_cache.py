@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Phone Cache - Persistent SQLite cache of numverify phone validation results
+"""
+
+import json
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+# Carrier and line type rarely change, so results are reused for a month
+DEFAULT_TTL_SECONDS = 30 * 24 * 3600
+
+
+def normalize_phone(phone: str) -> str:
+    """Normalize a phone number to its 10 digit US form (digits only, no leading 1)"""
+    digits = re.sub(r'\D', '', phone or '')
+    if len(digits) == 11 and digits.startswith('1'):
+        digits = digits[1:]
+    return digits
+
+
+class PhoneValidationCache:
+    """
+    Remembers numverify results keyed by normalized phone number.
+
+    A lookup hits while the entry is younger than the TTL, so only new or
+    stale numbers are sent to the API.
+    """
+
+    def __init__(self, path: str, ttl_seconds: int = DEFAULT_TTL_SECONDS):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+
+        # Validation workers share the connection; the lock serializes access
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS phones (
+                    number TEXT PRIMARY KEY,
+                    result TEXT NOT NULL,
+                    validated_at REAL NOT NULL
+                )
+            """)
+        self.prune()
+
+    def get(self, phone: str) -> Optional[Dict]:
+        """
+        Get the cached validation result for a phone number
+
+        Returns:
+            The stored result, or None if missing or expired
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result, validated_at FROM phones WHERE number = ?",
+                (normalize_phone(phone),)
+            ).fetchone()
+
+        if not row or time.time() - row[1] > self.ttl_seconds:
+            return None
+        return json.loads(row[0])
+
+    def put(self, phone: str, result: Dict):
+        """Store the validation result for a phone number"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO phones (number, result, validated_at) VALUES (?, ?, ?)",
+                (normalize_phone(phone), json.dumps(result), time.time())
+            )
+
+    def prune(self):
+        """Drop expired entries"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM phones WHERE validated_at < ?",
+                (time.time() - self.ttl_seconds,)
+            )
+
+    def close(self):
+        """Prune and close the database"""
+        self.prune()
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Profiling - Shared --profile option for the Coffree scripts
+
+`--profile [PREFIX]` runs the script under two profilers at once and writes:
+
+- PREFIX.pstats - deterministic cProfile stats, merged across threads
+  (open with `python3 -m pstats` or snakeviz). Python 3.12+ allows only one
+  active cProfile per process, so there it covers the main thread only and
+  the worker threads show up in the sampled stacks alone
+- PREFIX.folded - stacks of all threads sampled every few milliseconds, in the
+  collapsed format flamegraph.pl and speedscope read. Each stack's root is the
+  kind of time it shows: [network], [waiting] (sleeps, locks, idle workers) or [cpu]
+
+A summary of where the sampled time went is printed when the script ends.
+"""
+
+import cProfile
+import linecache
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional
+
+# Seconds between stack samples
+SAMPLE_INTERVAL = 0.005
+
+# A sample whose innermost Python frame is in one of these is blocked on the network
+NETWORK_MODULES = ('socket.py', 'ssl.py', 'selectors.py', 'http/client.py', 'urllib3/util/connection.py')
+
+# ...or in one of these, blocked on another thread
+WAITING_MODULES = ('threading.py', 'queue.py', 'concurrent/futures/')
+
+# Python 3.12 moved cProfile onto sys.monitoring, which allows a single profiler
+# at a time, so one per thread is only possible before that
+PER_THREAD_CPROFILE = sys.version_info < (3, 12)
+
+
+def add_profile_argument(parser):
+    """Add --profile to a script's argument parser"""
+    parser.add_argument(
+        '--profile',
+        nargs='?',
+        const='',
+        metavar='PREFIX',
+        help='Profile the run and write PREFIX.pstats and PREFIX.folded '
+             '(default prefix: <script>-<timestamp>)'
+    )
+
+
+def classify(frame) -> str:
+    """Tag a thread's innermost frame as 'network', 'waiting' or 'cpu'"""
+    filename = frame.f_code.co_filename.replace(os.sep, '/')
+    if any(filename.endswith(module) for module in NETWORK_MODULES):
+        return 'network'
+    if any(module in filename for module in WAITING_MODULES):
+        return 'waiting'
+
+    # time.sleep and Event.wait have no Python frame of their own, so look at the calling line
+    line = linecache.getline(frame.f_code.co_filename, frame.f_lineno)
+    if 'sleep(' in line or '.wait(' in line:
+        return 'waiting'
+    return 'cpu'
+
+
+def _frame_name(frame) -> str:
+    module = os.path.splitext(os.path.basename(frame.f_code.co_filename))[0]
+    return f"{module}:{frame.f_code.co_name}"
+
+
+class StackSampler:
+    """Samples the stacks of all threads from a background thread"""
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.kinds: Counter = Counter()
+        self.main_kinds: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profiler-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        main_id = threading.main_thread().ident
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+
+                kind = classify(frame)
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame))
+                    frame = frame.f_back
+
+                self.stacks[f"[{kind}];" + ';'.join(reversed(stack))] += 1
+                self.kinds[kind] += 1
+                if thread_id == main_id:
+                    self.main_kinds[kind] += 1
+
+    def write_folded(self, path: str):
+        """Write the samples in collapsed-stack format"""
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class ThreadProfiler:
+    """
+    cProfile for the calling thread and, before Python 3.12, every thread
+    started while it runs
+    """
+
+    def __init__(self):
+        self._profiles = []
+        self._lock = threading.Lock()
+
+    def _new(self) -> cProfile.Profile:
+        profile = cProfile.Profile()
+        with self._lock:
+            self._profiles.append(profile)
+        return profile
+
+    def _start_in_thread(self, *args):
+        # Installed by threading.setprofile; runs once as the new thread starts
+        sys.setprofile(None)
+        self._new().enable()
+
+    def start(self):
+        if PER_THREAD_CPROFILE:
+            threading.setprofile(self._start_in_thread)
+        self._main = self._new()
+        self._main.enable()
+
+    def stop(self):
+        self._main.disable()
+        if PER_THREAD_CPROFILE:
+            threading.setprofile(None)
+
+    def write_stats(self, path: str):
+        """Merge every thread's stats into one pstats file"""
+        stats = None
+        for profile in self._profiles:
+            try:
+                profile.create_stats()
+            except Exception:
+                continue  # Still running in a live thread; its stats are partial at best
+            if not profile.stats:
+                continue
+            if stats is None:
+                stats = pstats.Stats(profile)
+            else:
+                stats.add(profile)
+        if stats:
+            stats.dump_stats(path)
+
+
+@contextmanager
+def profile(prefix: Optional[str], script: str):
+    """
+    Profile the enclosed block if `prefix` is not None
+
+    Args:
+        prefix: Output path prefix from --profile ('' for the default, None to not profile)
+        script: Script name used in the default prefix
+    """
+    if prefix is None:
+        yield
+        return
+
+    prefix = prefix or f"{script}-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+    sampler = StackSampler()
+    profiler = ThreadProfiler()
+
+    wall_start = time.monotonic()
+    cpu_start = time.process_time()
+    sampler.start()
+    profiler.start()
+    try:
+        yield
+    finally:
+        profiler.stop()
+        sampler.stop()
+        wall = time.monotonic() - wall_start
+        cpu = time.process_time() - cpu_start
+
+        profiler.write_stats(f"{prefix}.pstats")
+        sampler.write_folded(f"{prefix}.folded")
+
+        print(f"\n{'='*70}")
+        print("🔬 Profile")
+        print(f"{'='*70}")
+        print(f"⏱️  Wall: {wall:.2f}s, process CPU: {cpu:.2f}s ({cpu / wall * 100 if wall else 0:.0f}%)")
+        for label, kinds in [('Main thread', sampler.main_kinds), ('All threads', sampler.kinds)]:
+            total = sum(kinds.values())
+            if total:
+                shares = ', '.join(
+                    f"{kind} {kinds[kind] / total * 100:.0f}%" for kind in ('network', 'waiting', 'cpu')
+                )
+                print(f"🧵 {label}: {shares} ({total} samples)")
+        print(f"📝 Wrote {prefix}.pstats{'' if PER_THREAD_CPROFILE else ' (main thread only)'} and {prefix}.folded")
+        print()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Rate Limiter - Thread-safe request pacing shared by the Coffree scripts
+"""
+
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Classic token bucket: `rate` tokens are added per second up to `capacity`.
+
+    Every outgoing request takes one token. Callers block in `acquire()` until
+    a token is available, so any number of worker threads can share a single
+    bucket and the combined request rate never exceeds the configured quota.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._last_refill
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._last_refill = now
+
+    def acquire(self, tokens: float = 1):
+        """Block until `tokens` tokens are available, then take them"""
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+
+            time.sleep(wait)
+
+
+class AdaptiveRateLimiter(TokenBucket):
+    """
+    Token bucket whose rate adapts to how the server responds (AIMD).
+
+    Every success nudges the rate up additively towards `max_rate`; a
+    throttling response (429/5xx) halves it down to `min_rate` and, when the
+    server sends Retry-After, pauses all callers until that time has passed.
+    Throttles within `cooldown` seconds of a decrease count as the same
+    congestion event, so a burst of concurrent 429s only halves the rate once.
+    """
+
+    def __init__(self, rate: float, capacity: float, min_rate: float = 0.5, max_rate: float = None,
+                 increase: float = 0.5, decrease: float = 0.5, cooldown: float = 1.0):
+        super().__init__(rate, capacity)
+        self.min_rate = min_rate
+        self.max_rate = max_rate or rate * 4
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+
+    def acquire(self, tokens: float = 1):
+        """Wait out any server-requested pause, then take tokens as usual"""
+        while True:
+            with self._lock:
+                wait = self._paused_until - time.monotonic()
+            if wait <= 0:
+                break
+            time.sleep(wait)
+        super().acquire(tokens)
+
+    def on_success(self):
+        """Grow the rate by roughly `increase` requests/second per second of successes"""
+        with self._lock:
+            self._refill()
+            self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+
+    def on_throttle(self, retry_after: float = None):
+        """Back off after a 429/5xx, honoring the server's Retry-After if given"""
+        with self._lock:
+            self._refill()
+            now = time.monotonic()
+            if now - self._last_decrease >= self.cooldown:
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+                self._last_decrease = now
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + retry_after)
+
+
+def parse_retry_after(value: str) -> Optional[float]:
+    """Parse a Retry-After header (seconds or HTTP date) into seconds"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
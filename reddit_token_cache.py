@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Reddit Token Cache - Reuse the application-only OAuth token across runs
+"""
+
+import json
+import os
+import time
+from typing import Optional
+
+# Tokens this close to expiry are not reused; fetching a new one is cheaper than a failed request
+MIN_REMAINING_SECONDS = 120
+
+
+def read_only_authorizer(reddit):
+    """The prawcore authorizer behind `reddit`'s read-only requests, or None if unavailable"""
+    core = getattr(reddit, '_read_only_core', None)
+    return getattr(core, 'authorizer', None) or getattr(core, '_authorizer', None)
+
+
+class RedditTokenCache:
+    """
+    Persists the read-only (client credentials) access token PRAW fetches,
+    so short runs skip the token request while the token is still valid.
+
+    The token is restored into PRAW's read-only authorizer before the first
+    request. If Reddit rejects it anyway (e.g. revoked), prawcore clears it
+    on the 401, fetches a new one and retries, so a stale file costs one
+    request. The file is only readable by its owner.
+    """
+
+    def __init__(self, path: str, client_id: str):
+        self.path = path
+        self.client_id = client_id
+
+    @staticmethod
+    def _remaining_seconds(authorizer) -> Optional[float]:
+        # prawcore >= 3 tracks expiry on the monotonic clock, older versions on the wall clock
+        if hasattr(authorizer, '_expiration_timestamp_ns'):
+            return (authorizer._expiration_timestamp_ns - time.monotonic_ns()) / 1e9
+        if hasattr(authorizer, '_expiration_timestamp'):
+            return authorizer._expiration_timestamp - time.time()
+        return None
+
+    def restore(self, reddit) -> bool:
+        """
+        Load a cached token into `reddit`'s read-only authorizer
+
+        Returns:
+            True if a valid token was restored
+        """
+        try:
+            with open(self.path) as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return False
+
+        remaining = cached.get('expires_at', 0) - time.time()
+        authorizer = read_only_authorizer(reddit)
+        if (cached.get('client_id') != self.client_id or not cached.get('access_token')
+                or remaining < MIN_REMAINING_SECONDS or authorizer is None):
+            return False
+
+        # A fresh authorizer has neither expiry attribute yet, so set both:
+        # prawcore >= 3 reads the monotonic one, older versions the wall clock one
+        authorizer._expiration_timestamp_ns = time.monotonic_ns() + int(remaining * 1e9)
+        authorizer._expiration_timestamp = time.time() + remaining
+        authorizer.access_token = cached['access_token']
+        authorizer.scopes = set(cached.get('scopes', ['*']))
+        return True
+
+    def save(self, reddit) -> bool:
+        """
+        Store `reddit`'s current read-only token if it is still valid
+
+        Returns:
+            True if the token was written
+        """
+        authorizer = read_only_authorizer(reddit)
+        if authorizer is None or not getattr(authorizer, 'access_token', None):
+            return False
+
+        remaining = self._remaining_seconds(authorizer)
+        if remaining is None or remaining < MIN_REMAINING_SECONDS:
+            return False
+
+        data = {
+            'client_id': self.client_id,
+            'access_token': authorizer.access_token,
+            'scopes': sorted(authorizer.scopes or []),
+            'expires_at': time.time() + remaining,
+        }
+
+        # Write owner-only, then swap it in so readers never see a partial file
+        tmp_path = f"{self.path}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+        return True
@@ -5,10 +5,21 @@ Retry Failed Campaigns - Find campaigns that failed to send and retry them
 
 import requests
 import os
+import json
 import time
+import atexit
+import argparse
+from datetime import datetime, timezone
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from itertools import chain
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 from supabase import create_client, Client
 
+from profiling import add_profile_argument, profile
+from rate_limiter import AdaptiveRateLimiter, parse_retry_after
+
 # Load environment variables
 load_dotenv()
 load_dotenv('.env.local')
@@ -18,7 +29,26 @@ SUPABASE_URL = os.getenv('NEXT_PUBLIC_SUPABASE_URL')
 SUPABASE_KEY = os.getenv('NEXT_PUBLIC_SUPABASE_ANON_KEY')
 
 # Capital One API
-CAPITAL_ONE_API = 'https://api.capitalone.com/protected/24565/retail/digital-offers/text-pass'
+CAPITAL_ONE_API = os.getenv('CAPITAL_ONE_API_URL', 'https://api.capitalone.com/protected/24565/retail/digital-offers/text-pass')
+
+# Delivery engine defaults: concurrent workers (= max open connections to
+# Capital One) and the starting request rate the adaptive limiter tunes from
+DEFAULT_CONCURRENCY = 8
+DEFAULT_RATE = 5.0
+
+# Status codes that mean "slow down and try again"
+THROTTLE_STATUSES = {429, 500, 502, 503, 504}
+
+# message_logs rows are buffered and written as multi-row inserts once this
+# many are queued or this many seconds have passed, whichever comes first
+LOG_BATCH_SIZE = 500
+LOG_FLUSH_INTERVAL = 2.0
+
+# Rows from failed flushes are kept here and replayed on the next run
+LOG_SPILL_FILE = os.getenv('MESSAGE_LOG_SPILL_FILE', 'message_logs_spill.jsonl')
+
+# Rows per page when streaming tables (PostgREST caps a response at 1000 rows by default)
+PAGE_SIZE = 1000
 
 
 def sanitize_marketing_channel(mc: str) -> str:
@@ -27,16 +57,208 @@ def sanitize_marketing_channel(mc: str) -> str:
     return re.sub(r'[^a-zA-Z]', '', mc) if mc else ''
 
 
-def send_coffee_to_phone(phone: str, platform: str, campaign_id: str, marketing_channel: str, max_retries: int = 3) -> dict:
-    """Send a campaign to a phone number with retry logic"""
+def iter_pending_deliveries(supabase: Client, page_size: int = PAGE_SIZE):
+    """
+    Stream the (campaign, phone) pairs that still need a send
+
+    The pending_deliveries RPC does the anti-join against message_logs in
+    SQL and returns only valid-campaign/phone pairs with no successful send
+    whose latest failure (if any) was a network error; campaigns cached as
+    expired/invalid are excluded. Pages are keyed on
+    (campaign_id, phone), so memory and transfer scale with pending work.
+    """
+    after_campaign, after_phone = '', ''
+
+    while True:
+        rows = supabase.rpc('pending_deliveries', {
+            'after_campaign': after_campaign,
+            'after_phone': after_phone,
+            'page_size': page_size,
+        }).execute().data
+        # Stop on an empty page rather than a short one, in case the server caps pages below page_size
+        if not rows:
+            return
+
+        yield from rows
+        after_campaign, after_phone = rows[-1]['campaign_id'], rows[-1]['phone']
+
+
+class BufferedLogWriter:
+    """
+    Collects message_logs rows and writes them in the background as
+    multi-row inserts, so the send loop never waits on the database.
+
+    Rows are flushed when LOG_BATCH_SIZE are queued, every LOG_FLUSH_INTERVAL
+    seconds, and on close/exit. A batch that fails to insert is appended to
+    the spill file (JSON lines) and replayed by `replay_spill()` next run.
+    """
+
+    def __init__(self, supabase: Client, table: str = 'message_logs', batch_size: int = LOG_BATCH_SIZE,
+                 flush_interval: float = LOG_FLUSH_INTERVAL, spill_file: str = LOG_SPILL_FILE):
+        self.supabase = supabase
+        self.table = table
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spill_file = spill_file
+        self.written = 0
+        self.spilled = 0
+
+        self._rows = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def add(self, row: dict):
+        """Queue a row; wakes the writer when a full batch is ready"""
+        with self._lock:
+            self._rows.append(row)
+            if len(self._rows) >= self.batch_size:
+                self._wake.set()
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        """Write all queued rows now, in batches of at most batch_size"""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._rows = self._rows, []
+
+            for start in range(0, len(rows), self.batch_size):
+                batch = rows[start:start + self.batch_size]
+                try:
+                    self.supabase.table(self.table).insert(batch).execute()
+                    self.written += len(batch)
+                except Exception as e:
+                    print(f"   ⚠️  Failed to write {len(batch)} log row(s), saving to {self.spill_file}: {e}")
+                    self._spill(batch)
+
+    def _spill(self, rows: list):
+        with open(self.spill_file, 'a') as f:
+            for row in rows:
+                f.write(json.dumps(row) + '\n')
+        self.spilled += len(rows)
+
+    def replay_spill(self) -> int:
+        """
+        Queue rows left in the spill file by a previous run; returns how many
+
+        A `.replay` file left by a run that crashed mid-replay is replayed
+        first. Lines that don't parse (e.g. a write cut short by a crash) are
+        moved to `<spill>.bad` instead of aborting the run.
+        """
+        replay_file = f"{self.spill_file}.replay"
+        replayed = 0
+
+        if os.path.exists(replay_file):
+            replayed += self._replay_file(replay_file)
+
+        if os.path.exists(self.spill_file):
+            # Move the file aside first so rows that fail again are spilled afresh
+            os.replace(self.spill_file, replay_file)
+            replayed += self._replay_file(replay_file)
+
+        return replayed
+
+    def _replay_file(self, path: str) -> int:
+        rows, bad = [], []
+        with open(path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    rows.append(json.loads(line))
+                except ValueError:
+                    bad.append(line if line.endswith('\n') else line + '\n')
+
+        if bad:
+            bad_file = f"{self.spill_file}.bad"
+            print(f"   ⚠️  Skipping {len(bad)} unreadable log row(s) in {path}, saved to {bad_file}")
+            with open(bad_file, 'a') as f:
+                f.writelines(bad)
+
+        for row in rows:
+            self.add(row)
+        self.flush()
+        os.remove(path)
+        return len(rows)
+
+    def close(self):
+        """Stop the background writer and flush whatever is left"""
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._thread.join()
+        self.flush()
+
+
+def create_session(pool_size: int) -> requests.Session:
+    """Create a keep-alive session holding at most `pool_size` connections per host"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def campaign_error_type(error: str):
+    """
+    Classify a send error that applies to the whole campaign
+
+    Returns:
+        'expired', 'invalid', or None if the error is specific to the phone or transient
+    """
+    error = (error or '').lower()
+    if 'expired' in error:
+        return 'expired'
+    if 'invalid campaign' in error:
+        return 'invalid'
+    return None
+
+
+def cache_campaign_validation(supabase: Client, campaign_id: str, result: str):
+    """Store a campaign's failed validation in the campaigns table so later sends skip it"""
+    try:
+        supabase.table('campaigns').update({
+            'is_valid': False,
+            'is_expired': result == 'expired',
+            'validation_result': result,
+            'last_validated_at': datetime.now(timezone.utc).isoformat(),
+        }).eq('campaign_id', campaign_id).execute()
+    except Exception as e:
+        print(f"   ⚠️  Could not cache validation result for campaign {campaign_id}: {e}")
+
+
+def send_coffee_to_phone(phone: str, platform: str, campaign_id: str, marketing_channel: str, max_retries: int = 3,
+                         session: requests.Session = None, limiter: AdaptiveRateLimiter = None) -> dict:
+    """
+    Send a campaign to a phone number with retry logic
+
+    Network errors and throttling responses (429/5xx) are retried with
+    exponential backoff. When a shared limiter is given, every attempt takes a
+    token from it and throttling responses slow it down for all workers.
+    """
     api_platform = 'iOS' if platform == 'apple' else 'android'
+    http = session or requests
 
     # Sanitize marketing channel
     marketing_channel = sanitize_marketing_channel(marketing_channel)
 
+    error = 'Network error'
     for attempt in range(1, max_retries + 1):
+        if limiter:
+            limiter.acquire()
+
         try:
-            response = requests.post(
+            response = http.post(
                 CAPITAL_ONE_API,
                 headers={
                     'accept': 'application/json; v=1',
@@ -52,24 +274,48 @@ def send_coffee_to_phone(phone: str, platform: str, campaign_id: str, marketing_
                 timeout=30
             )
 
-            data = response.json()
+            if response.status_code in THROTTLE_STATUSES:
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                if limiter:
+                    limiter.on_throttle(retry_after)
+                # Reported as a network error so a later run retries it
+                error = f'Network error (HTTP {response.status_code})'
+                if attempt < max_retries:
+                    time.sleep(retry_after if retry_after is not None else 2 ** attempt)
+                continue
+
+            if limiter:
+                limiter.on_success()
 
             if response.status_code == 200 or response.ok:
                 return {'success': True}
 
+            try:
+                data = response.json()
+            except ValueError:
+                data = {}
             return {'success': False, 'error': data.get('developerText', 'Failed to send')}
 
-        except requests.exceptions.RequestException as e:
+        except requests.exceptions.RequestException:
+            error = 'Network error'
             if attempt < max_retries:
-                print(f"      Network error, retrying in 2s... (attempt {attempt}/{max_retries})")
-                time.sleep(2)
+                time.sleep(2 ** attempt)
                 continue
-            return {'success': False, 'error': 'Network error'}
 
-    return {'success': False, 'error': 'Network error'}
+    return {'success': False, 'error': error}
 
 
-def main():
+def retry_failed(yes: bool = False, concurrency: int = DEFAULT_CONCURRENCY, rate: float = DEFAULT_RATE):
+    """
+    Send every pending (campaign, phone) delivery
+
+    Args:
+        yes: Retry without asking for confirmation
+        concurrency: Concurrent sends / open connections to Capital One
+        rate: Starting requests per second for the adaptive rate limiter
+    """
+    concurrency = max(1, concurrency)
+
     print("\n" + "="*70)
     print("🔄 Retry Failed Campaigns")
     print("="*70 + "\n")
@@ -77,105 +323,27 @@ def main():
     # Connect to Supabase
     supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
-    # Get all valid campaigns
-    print("📋 Fetching valid campaigns...")
-    campaigns_result = supabase.table('campaigns').select('*').eq('is_valid', True).eq('is_expired', False).execute()
-    campaigns = campaigns_result.data
-    print(f"   Found {len(campaigns)} valid campaigns\n")
-
-    if not campaigns:
-        print("❌ No valid campaigns found.")
-        return
-
-    # Get all phone numbers
-    print("📱 Fetching phone numbers...")
-    phones_result = supabase.table('phone_numbers').select('*').execute()
-    phones = phones_result.data
-    print(f"   Found {len(phones)} phone numbers\n")
+    # Buffered writer for message_logs; first replay rows a previous run couldn't write
+    log_writer = BufferedLogWriter(supabase)
+    replayed = log_writer.replay_spill()
+    if replayed:
+        print(f"📝 Replayed {replayed} log row(s) from {LOG_SPILL_FILE}\n")
 
-    if not phones:
-        print("❌ No phone numbers found.")
-        return
-
-    # Get all successful message logs to know what's already been sent
-    print("📊 Fetching message logs...")
-    logs_result = supabase.table('message_logs').select('campaign_id, phone_number, status, error_message').execute()
-    all_logs = logs_result.data
-
-    # Build sets for quick lookup
-    successful_sends = set()
-    failed_sends = {}  # (campaign_id, phone) -> error_message
-
-    for log in all_logs:
-        key = (log['campaign_id'], log['phone_number'])
-        if log['status'] == 'success':
-            successful_sends.add(key)
-        elif log['status'] == 'failed':
-            failed_sends[key] = log.get('error_message', 'Unknown error')
-
-    print(f"   Successful sends: {len(successful_sends)}")
-    print(f"   Failed sends: {len(failed_sends)}\n")
-
-    # Find campaigns that need to be retried
-    # These are: valid campaigns that either failed or were never sent to phones
-    to_retry = []
-
-    for campaign in campaigns:
-        cid = campaign['campaign_id']
-        mc = campaign['marketing_channel']
-        link = campaign['full_link']
-
-        for phone in phones:
-            phone_num = phone['phone']
-            platform = phone['platform']
-            key = (cid, phone_num)
-
-            # Skip if already successfully sent
-            if key in successful_sends:
-                continue
+    # Stream the pending (campaign, phone) pairs computed server-side. Rows are
+    # sent as they arrive, so memory is bounded by the in-flight window rather
+    # than by the number of pending deliveries
+    print("📋 Fetching pending deliveries...")
+    pending = iter_pending_deliveries(supabase)
+    first = next(pending, None)
 
-            # Check if it was a network error (should be retried)
-            error = failed_sends.get(key, None)
-            if error and 'network' in error.lower():
-                to_retry.append({
-                    'campaign_id': cid,
-                    'marketing_channel': mc,
-                    'full_link': link,
-                    'phone': phone_num,
-                    'platform': platform,
-                    'reason': f'Previously failed: {error}'
-                })
-            elif key not in failed_sends:
-                # Never attempted - should be sent
-                to_retry.append({
-                    'campaign_id': cid,
-                    'marketing_channel': mc,
-                    'full_link': link,
-                    'phone': phone_num,
-                    'platform': platform,
-                    'reason': 'Never sent'
-                })
-
-    if not to_retry:
+    if first is None:
         print("✅ All campaigns have been successfully sent to all phones!")
         return
 
-    print(f"🔄 Found {len(to_retry)} campaign/phone combinations to retry:\n")
-
-    # Group by reason for display
-    network_errors = [r for r in to_retry if 'network' in r['reason'].lower()]
-    never_sent = [r for r in to_retry if r['reason'] == 'Never sent']
-
-    if network_errors:
-        print(f"   - {len(network_errors)} with previous network errors")
-    if never_sent:
-        print(f"   - {len(never_sent)} never sent")
-
-    print()
+    print("🔄 Found campaign/phone combinations to retry\n")
 
     # Auto-proceed (for non-interactive mode)
-    import sys
-    if '--yes' in sys.argv or '-y' in sys.argv:
+    if yes:
         pass  # Auto-proceed
     else:
         try:
@@ -191,64 +359,175 @@ def main():
     print("Starting retry process...")
     print("="*70 + "\n")
 
+    print(f"Concurrency: {concurrency}, starting rate: {rate}/s\n")
+
     success_count = 0
     fail_count = 0
-
-    for i, item in enumerate(to_retry, 1):
+    skipped_count = 0
+    network_error_count = 0
+    never_sent_count = 0
+    completed = 0
+    session = create_session(concurrency)
+    limiter = AdaptiveRateLimiter(rate, capacity=concurrency)
+
+    # Campaigns found expired/invalid during this run; their remaining sends are skipped
+    bad_campaigns = {}
+
+    def deliver(item):
+        if item['campaign_id'] in bad_campaigns:
+            return {'success': False, 'skipped': True, 'error': f"Campaign {bad_campaigns[item['campaign_id']]}"}
+        return send_coffee_to_phone(
+            item['phone'],
+            item['platform'],
+            item['campaign_id'],
+            item['marketing_channel'],
+            session=session,
+            limiter=limiter
+        )
+
+    def record(future, item):
+        """Print and log one finished send; runs on the main thread"""
+        nonlocal success_count, fail_count, skipped_count, completed
+        completed += 1
         cid = item['campaign_id']
         mc = item['marketing_channel']
         phone = item['phone']
-        platform = item['platform']
         reason = item['reason']
 
         # Mask phone for display
         masked_phone = f"***{phone[-4:]}" if len(phone) >= 4 else "****"
 
-        print(f"[{i}/{len(to_retry)}] Campaign {cid} -> {masked_phone}")
+        print(f"[{completed}] Campaign {cid} -> {masked_phone}")
         print(f"   Reason: {reason}")
 
-        result = send_coffee_to_phone(phone, platform, cid, mc)
-
-        if result['success']:
+        try:
+            result = future.result()
+        except Exception as e:
+            result = {'success': False, 'error': f'Network error ({e})'}
+
+        if result.get('skipped'):
+            print(f"   ⏭️  Skipped: {result['error']}")
+            skipped_count += 1
+        elif result['success']:
             print(f"   ✅ Success!")
             success_count += 1
 
             # Log the success
-            supabase.table('message_logs').insert({
+            log_writer.add({
                 'campaign_id': cid,
                 'marketing_channel': sanitize_marketing_channel(mc),
                 'link': item['full_link'],
                 'phone_number': phone,
                 'status': 'success',
                 'error_message': None,
-            }).execute()
+            })
         else:
             error = result.get('error', 'Unknown error')
             print(f"   ❌ Failed: {error}")
             fail_count += 1
 
+            error_type = campaign_error_type(error)
+            if error_type and cid not in bad_campaigns:
+                bad_campaigns[cid] = error_type
+                cache_campaign_validation(supabase, cid, error_type)
+
             # Log the failure
-            supabase.table('message_logs').insert({
+            log_writer.add({
                 'campaign_id': cid,
                 'marketing_channel': sanitize_marketing_channel(mc),
                 'link': item['full_link'],
                 'phone_number': phone,
                 'status': 'failed',
                 'error_message': error,
-            }).execute()
+            })
 
         print()
 
-        # Small delay between requests to be nice to the API
-        time.sleep(0.5)
+    # At most this many sends are queued or running at once; the next page is
+    # only fetched once the window has drained enough to need it
+    max_in_flight = concurrency * 2
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        in_flight = {}
+
+        for row in chain([first], pending):
+            if row['previously_failed']:
+                reason = f"Previously failed: {row['last_error']}"
+            else:
+                reason = 'Never sent'
+
+            if 'network' in reason.lower():
+                network_error_count += 1
+            elif reason == 'Never sent':
+                never_sent_count += 1
+
+            item = {
+                'campaign_id': row['campaign_id'],
+                'marketing_channel': row['marketing_channel'],
+                'full_link': row['full_link'],
+                'phone': row['phone'],
+                'platform': row['platform'],
+                'reason': reason
+            }
+            in_flight[pool.submit(deliver, item)] = item
+
+            if len(in_flight) >= max_in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    record(future, in_flight.pop(future))
+
+        # Results are logged from this thread as they complete
+        for future in as_completed(in_flight):
+            record(future, in_flight[future])
+
+    # Write any remaining buffered log rows
+    log_writer.close()
 
     print("="*70)
     print("Summary:")
     print("="*70)
+    print(f"🔄 Retried: {completed}")
+    if network_error_count:
+        print(f"   - {network_error_count} with previous network errors")
+    if never_sent_count:
+        print(f"   - {never_sent_count} never sent")
     print(f"✅ Successful: {success_count}")
     print(f"❌ Failed: {fail_count}")
+    if skipped_count:
+        print(f"⏭️  Skipped (campaign expired/invalid): {skipped_count}")
+    print(f"📝 Log rows written: {log_writer.written}")
+    if log_writer.spilled:
+        print(f"⚠️  Log rows saved to {LOG_SPILL_FILE}: {log_writer.spilled} (replayed on next run)")
     print()
 
 
+def main():
+    parser = argparse.ArgumentParser(
+        description='Retry campaigns that failed or were never sent to subscribed phones'
+    )
+    parser.add_argument(
+        '-y', '--yes',
+        action='store_true',
+        help='Retry without asking for confirmation'
+    )
+    parser.add_argument(
+        '--concurrency',
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f'Concurrent sends / open connections to Capital One (default: {DEFAULT_CONCURRENCY})'
+    )
+    parser.add_argument(
+        '--rate',
+        type=float,
+        default=DEFAULT_RATE,
+        help=f'Starting requests per second; adapts to 429/5xx responses (default: {DEFAULT_RATE})'
+    )
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    with profile(args.profile, 'retry_failed'):
+        retry_failed(yes=args.yes, concurrency=args.concurrency, rate=args.rate)
+
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Run Metrics - Per-phase timings and HTTP request counts for a Coffree run
+"""
+
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+
+# Comment trees and post ids would give every request its own endpoint
+_PATH_IDS = [
+    (re.compile(r'/comments/[^/]+.*'), '/comments/:id'),
+    (re.compile(r'/by_id/[^/]+'), '/by_id/:ids'),
+]
+
+
+def endpoint_name(service: str, method: str, url: str) -> str:
+    """Name a request by service, method and path with ids stripped, e.g. 'reddit GET /comments/:id'"""
+    path = urlparse(url).path.rstrip('/') or '/'
+    for pattern, replacement in _PATH_IDS:
+        path = pattern.sub(replacement, path)
+    return f"{service} {method} {path}"
+
+
+class RunMetrics:
+    """
+    Collects where a run spends its time.
+
+    Phases are timed with `phase()`; phases entered from several threads at
+    once (e.g. comment expansion) add up their per-thread time, so they can
+    exceed the run's wall time. Sessions passed to `instrument()` count every
+    response per endpoint along with its latency, errors (HTTP >= 400) and
+    Reddit's rate limit headers. Retries made by our own code are counted
+    with `count_retry()`.
+    """
+
+    def __init__(self):
+        self.started_at = datetime.now(timezone.utc)
+        self._start = time.monotonic()
+        self._lock = threading.Lock()
+        self.phases: Dict[str, float] = {}
+        self.http: Dict[str, Dict[str, float]] = {}
+        self.reddit_rate_limit: Dict[str, Optional[float]] = {
+            'min_remaining': None,
+            'remaining': None,
+            'used': None,
+            'reset_seconds': None,
+        }
+
+    @property
+    def duration(self) -> float:
+        """Seconds since the run started"""
+        return time.monotonic() - self._start
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time the enclosed block and add it to phase `name`"""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started
+            with self._lock:
+                self.phases[name] = self.phases.get(name, 0.0) + elapsed
+
+    def _endpoint(self, name: str) -> Dict[str, float]:
+        return self.http.setdefault(name, {'calls': 0, 'errors': 0, 'retries': 0, 'seconds': 0.0})
+
+    def count_retry(self, endpoint: str):
+        """Count one retry of `endpoint` (as named by endpoint_name)"""
+        with self._lock:
+            self._endpoint(endpoint)['retries'] += 1
+
+    def instrument(self, session: requests.Session, service: str) -> requests.Session:
+        """
+        Count every response received on `session`
+
+        Args:
+            session: Session to hook
+            service: Label for its endpoints, e.g. 'api' or 'reddit'
+
+        Returns:
+            The same session
+        """
+        def on_response(response, *args, **kwargs):
+            name = endpoint_name(service, response.request.method, response.url)
+            remaining = response.headers.get('x-ratelimit-remaining')
+
+            with self._lock:
+                stats = self._endpoint(name)
+                stats['calls'] += 1
+                stats['seconds'] += response.elapsed.total_seconds()
+                if response.status_code >= 400:
+                    stats['errors'] += 1
+
+                if remaining is not None:
+                    try:
+                        limit = self.reddit_rate_limit
+                        limit['remaining'] = float(remaining)
+                        limit['used'] = int(response.headers.get('x-ratelimit-used', 0))
+                        limit['reset_seconds'] = int(response.headers.get('x-ratelimit-reset', 0))
+                        if limit['min_remaining'] is None or limit['remaining'] < limit['min_remaining']:
+                            limit['min_remaining'] = limit['remaining']
+                    except ValueError:
+                        pass
+
+        session.hooks['response'].append(on_response)
+        return session
+
+    def to_dict(self) -> Dict:
+        """Snapshot as JSON-serializable data, as stored in search_logs.metrics"""
+        with self._lock:
+            return {
+                'duration_seconds': round(self.duration, 3),
+                'phases': {name: round(seconds, 3) for name, seconds in sorted(self.phases.items())},
+                'http': {
+                    name: dict(stats, seconds=round(stats['seconds'], 3))
+                    for name, stats in sorted(self.http.items())
+                },
+                'reddit_rate_limit': dict(self.reddit_rate_limit),
+            }
+
+    def write_prometheus(self, path: str, job: str = 'coffree_finder'):
+        """
+        Write the metrics in Prometheus text format (for node_exporter's textfile collector)
+
+        The file is replaced atomically so the collector never reads a partial write.
+        """
+        snapshot = self.to_dict()
+        labels = f'job="{job}"'
+        lines = [
+            '# HELP coffree_run_duration_seconds Wall time of the last run.',
+            '# TYPE coffree_run_duration_seconds gauge',
+            f'coffree_run_duration_seconds{{{labels}}} {snapshot["duration_seconds"]}',
+            '# HELP coffree_run_timestamp_seconds When the last run started.',
+            '# TYPE coffree_run_timestamp_seconds gauge',
+            f'coffree_run_timestamp_seconds{{{labels}}} {self.started_at.timestamp():.0f}',
+            '# HELP coffree_phase_seconds Time spent per phase of the last run.',
+            '# TYPE coffree_phase_seconds gauge',
+        ]
+        for name, seconds in snapshot['phases'].items():
+            lines.append(f'coffree_phase_seconds{{{labels},phase="{name}"}} {seconds}')
+
+        for metric, key, help_text in [
+            ('coffree_http_requests', 'calls', 'HTTP responses received per endpoint in the last run.'),
+            ('coffree_http_errors', 'errors', 'HTTP responses with status >= 400 per endpoint in the last run.'),
+            ('coffree_http_retries', 'retries', 'Requests retried per endpoint in the last run.'),
+            ('coffree_http_seconds', 'seconds', 'Time spent waiting on each endpoint in the last run.'),
+        ]:
+            lines.append(f'# HELP {metric} {help_text}')
+            lines.append(f'# TYPE {metric} gauge')
+            for name, stats in snapshot['http'].items():
+                lines.append(f'{metric}{{{labels},endpoint="{name}"}} {stats[key]}')
+
+        remaining = snapshot['reddit_rate_limit']['min_remaining']
+        if remaining is not None:
+            lines.append('# HELP coffree_reddit_ratelimit_min_remaining Lowest Reddit rate limit headroom seen.')
+            lines.append('# TYPE coffree_reddit_ratelimit_min_remaining gauge')
+            lines.append(f'coffree_reddit_ratelimit_min_remaining{{{labels}}} {remaining}')
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(tmp_path, path)
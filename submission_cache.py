@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Submission Cache - Persistent SQLite cache of Reddit comment-tree scan results
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+# Entries older than this are re-scanned even if the comment count is unchanged
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+
+# Least recently used entries beyond this count are evicted
+DEFAULT_MAX_ENTRIES = 10000
+
+
+class SubmissionCache:
+    """
+    Remembers the result of scanning a submission's comment tree, keyed by
+    submission id together with the `num_comments` it had at the time.
+
+    A lookup hits only while the entry is younger than the TTL and the post
+    has not gained comments since, so comment trees are expanded again only
+    for new posts or posts with new comments.
+    """
+
+    def __init__(self, path: str, ttl_seconds: int = DEFAULT_TTL_SECONDS, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+        # Scan workers share the connection; the lock serializes access
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS submissions (
+                    id TEXT PRIMARY KEY,
+                    num_comments INTEGER NOT NULL,
+                    result TEXT NOT NULL,
+                    scanned_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_submissions_accessed_at ON submissions(accessed_at)"
+            )
+        self.prune()
+
+    def get(self, submission_id: str, num_comments: int) -> Optional[Dict]:
+        """
+        Get the cached scan result for a submission
+
+        Returns:
+            The stored result, or None if missing, expired or the post has new comments
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT num_comments, result, scanned_at FROM submissions WHERE id = ?",
+                (submission_id,)
+            ).fetchone()
+
+            if not row:
+                return None
+
+            cached_comments, result, scanned_at = row
+            if num_comments > cached_comments or now - scanned_at > self.ttl_seconds:
+                return None
+
+            self._conn.execute(
+                "UPDATE submissions SET accessed_at = ? WHERE id = ?",
+                (now, submission_id)
+            )
+            return json.loads(result)
+
+    def put(self, submission_id: str, num_comments: int, result: Dict):
+        """Store the scan result for a submission"""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO submissions (id, num_comments, result, scanned_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (submission_id, num_comments, json.dumps(result), now, now)
+            )
+
+    def prune(self):
+        """Drop expired entries and evict least recently used ones beyond max_entries"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM submissions WHERE scanned_at < ?",
+                (time.time() - self.ttl_seconds,)
+            )
+            self._conn.execute(
+                "DELETE FROM submissions WHERE id IN ("
+                "  SELECT id FROM submissions ORDER BY accessed_at DESC LIMIT -1 OFFSET ?"
+                ")",
+                (self.max_entries,)
+            )
+
+    def close(self):
+        """Prune and close the database"""
+        self.prune()
+        with self._lock:
+            self._conn.close()
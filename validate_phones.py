@@ -5,24 +5,54 @@ Validate Phone Numbers - Check all subscribed phone numbers using numverify API
 
 import requests
 import os
-import time
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+
+from phone_cache import PhoneValidationCache, DEFAULT_TTL_SECONDS
+from profiling import add_profile_argument, profile
+from rate_limiter import TokenBucket
 
 # Configuration
 API_BASE_URL = os.getenv('API_BASE_URL', 'http://localhost:3001')
 NUMVERIFY_API_KEY = os.getenv('NUMVERIFY_API_KEY', '51248de2d4762f2318f510be76dbe25f')
+NUMVERIFY_API_URL = os.getenv('NUMVERIFY_API_URL', 'http://apilayer.net/api/validate')
+
+# numverify lookups allowed per second on your plan, and concurrent lookups in flight
+NUMVERIFY_REQUESTS_PER_SECOND = float(os.getenv('NUMVERIFY_REQUESTS_PER_SECOND', '1'))
+DEFAULT_CONCURRENCY = 4
+
+# Validation results are cached per normalized number; carrier/line type rarely change
+CACHE_FILE = os.getenv('PHONE_VALIDATION_CACHE_FILE', '.phone_validation_cache.sqlite3')
+CACHE_TTL_SECONDS = int(os.getenv('PHONE_VALIDATION_TTL_SECONDS', DEFAULT_TTL_SECONDS))
+
 
+def create_session(pool_size: int) -> requests.Session:
+    """Create a session whose connection pool fits `pool_size` concurrent requests"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
 
-def validate_phone_with_api(phone: str) -> dict:
+
+def validate_phone_with_api(phone: str, session: requests.Session = None, limiter: TokenBucket = None) -> dict:
     """
     Validate a phone number using the numverify API
 
+    Args:
+        phone: Phone number to validate
+        session: Session to send the request on (default: a one-off request)
+        limiter: Shared rate limiter; one token is taken per lookup
+
     Returns:
         dict with keys: valid, country_code, carrier, line_type, error
     """
     try:
-        url = f"http://apilayer.net/api/validate?access_key={NUMVERIFY_API_KEY}&number={phone}"
-        response = requests.get(url, timeout=10)
+        if limiter:
+            limiter.acquire()
+        url = f"{NUMVERIFY_API_URL}?access_key={NUMVERIFY_API_KEY}&number={phone}"
+        response = (session or requests).get(url, timeout=10)
         data = response.json()
 
         if 'success' in data and data['success'] is False:
@@ -53,10 +83,10 @@ def validate_phone_with_api(phone: str) -> dict:
         }
 
 
-def delete_phone(phone: str) -> bool:
+def delete_phone(phone: str, session: requests.Session = None) -> bool:
     """Delete a phone number from the database"""
     try:
-        response = requests.delete(
+        response = (session or requests).delete(
             f"{API_BASE_URL}/api/phone",
             params={'phone': phone},
             timeout=10
@@ -67,18 +97,30 @@ def delete_phone(phone: str) -> bool:
         return False
 
 
-def validate_all_phones(auto_delete=False):
-    """Fetch and validate all phone numbers"""
+def validate_all_phones(auto_delete=False, concurrency: int = DEFAULT_CONCURRENCY,
+                        rate: float = NUMVERIFY_REQUESTS_PER_SECOND, cache_file: str = CACHE_FILE):
+    """
+    Fetch and validate all phone numbers
+
+    Numbers with a cached result younger than the TTL are not looked up
+    again; the rest go through a pool of `concurrency` workers sharing one
+    token bucket of `rate` lookups per second.
+    """
     print(f"\n🔍 Validating Phone Numbers")
     print(f"{'='*70}")
     print(f"API: {API_BASE_URL}")
     print(f"Numverify API Key: {'*' * 20}{NUMVERIFY_API_KEY[-4:] if len(NUMVERIFY_API_KEY) > 4 else '****'}")
     print(f"Auto-delete invalid: {'YES' if auto_delete else 'NO'}")
+    print(f"Concurrency: {concurrency}, rate: {rate}/s")
+    print(f"Cache: {cache_file or 'disabled'}")
     print(f"{'='*70}\n")
 
+    session = create_session(concurrency)
+    cache = PhoneValidationCache(cache_file, CACHE_TTL_SECONDS) if cache_file else None
+
     # Fetch all phones
     try:
-        response = requests.get(f"{API_BASE_URL}/api/phone", timeout=10)
+        response = session.get(f"{API_BASE_URL}/api/phone", timeout=10)
         if not response.ok:
             print(f"❌ Error fetching phones: {response.status_code}")
             return
@@ -101,20 +143,42 @@ def validate_all_phones(auto_delete=False):
     invalid_count = 0
     error_count = 0
     deleted_count = 0
+    cached_count = 0
+
+    # Cached numbers are answered locally; only new or stale ones cost quota
+    cached_results = []
+    to_lookup = []
+    for phone_record in phones:
+        cached = cache.get(phone_record.get('phone', '')) if cache else None
+        if cached is not None:
+            cached_results.append((phone_record, cached))
+        else:
+            to_lookup.append(phone_record)
 
-    for i, phone_record in enumerate(phones, 1):
-        phone = phone_record.get('phone', '')
-        platform = phone_record.get('platform', 'unknown')
-        created = phone_record.get('created_at', '')
+    print(f"📦 {len(cached_results)} cached, {len(to_lookup)} to look up\n")
 
-        print(f"[{i}/{len(phones)}] Validating {phone} ({platform})...")
+    limiter = TokenBucket(rate, capacity=1)
+    pool = ThreadPoolExecutor(max_workers=max(1, concurrency))
+    futures = {
+        pool.submit(validate_phone_with_api, phone_record.get('phone', ''), session, limiter): phone_record
+        for phone_record in to_lookup
+    }
 
-        # Validate with API
-        result = validate_phone_with_api(phone)
+    def completed():
+        for phone_record, result in cached_results:
+            yield phone_record, result, True
+        for future in as_completed(futures):
+            yield futures[future], future.result(), False
 
-        # Rate limit protection - wait between requests
-        if i < len(phones):
-            time.sleep(1)  # Wait 1 second between API calls
+    for i, (phone_record, result, from_cache) in enumerate(completed(), 1):
+        phone = phone_record.get('phone', '')
+        platform = phone_record.get('platform', 'unknown')
+
+        print(f"[{i}/{len(phones)}] Validated {phone} ({platform}){' (cached)' if from_cache else ''}")
+        if from_cache:
+            cached_count += 1
+        elif cache and not result.get('api_error'):
+            cache.put(phone, result)
 
         if result.get('api_error'):
             print(f"   ⚠️  API Error: {result.get('error')}")
@@ -134,7 +198,7 @@ def validate_all_phones(auto_delete=False):
 
             if auto_delete:
                 print(f"      Deleting from database...")
-                if delete_phone(phone):
+                if delete_phone(phone, session):
                     print(f"      ✅ Deleted successfully")
                     deleted_count += 1
                 else:
@@ -142,6 +206,10 @@ def validate_all_phones(auto_delete=False):
 
         print()
 
+    pool.shutdown()
+    if cache:
+        cache.close()
+
     # Summary
     print(f"\n{'='*70}")
     print(f"Validation Summary")
@@ -149,6 +217,7 @@ def validate_all_phones(auto_delete=False):
     print(f"✅ Valid: {valid_count}")
     print(f"❌ Invalid: {invalid_count}")
     print(f"⚠️  API Errors: {error_count}")
+    print(f"📦 From cache: {cached_count}")
 
     if auto_delete:
         print(f"🗑️  Deleted: {deleted_count}")
@@ -178,6 +247,30 @@ def main():
         action='store_true',
         help='Automatically delete invalid phone numbers'
     )
+    parser.add_argument(
+        '--concurrency',
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f'Concurrent numverify lookups (default: {DEFAULT_CONCURRENCY})'
+    )
+    parser.add_argument(
+        '--rate',
+        type=float,
+        default=NUMVERIFY_REQUESTS_PER_SECOND,
+        help=f'numverify lookups per second allowed by your plan (default: {NUMVERIFY_REQUESTS_PER_SECOND}, '
+             'or NUMVERIFY_REQUESTS_PER_SECOND)'
+    )
+    parser.add_argument(
+        '--cache-file',
+        default=CACHE_FILE,
+        help=f'SQLite cache of validation results (default: {CACHE_FILE})'
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Look up every number instead of using cached results'
+    )
+    add_profile_argument(parser)
 
     args = parser.parse_args()
 
@@ -188,7 +281,13 @@ def main():
     if args.api_key:
         os.environ['NUMVERIFY_API_KEY'] = args.api_key
 
-    validate_all_phones(auto_delete=args.delete_invalid)
+    with profile(args.profile, 'validate_phones'):
+        validate_all_phones(
+            auto_delete=args.delete_invalid,
+            concurrency=args.concurrency,
+            rate=args.rate,
+            cache_file=None if args.no_cache else args.cache_file
+        )
 
 
 if __name__ == '__main__':